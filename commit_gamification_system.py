@@ -4,36 +4,42 @@ Script to safely commit the gamification system to git.
 This ensures all our hackathon work is preserved.
 """
 
-import subprocess
+import asyncio
 import os
 from datetime import datetime
 
-def run_command(command, description):
-    """Run a git command and print the result"""
+async def run_command(command, description, input_text=None):
+    """Run a git command (as an argv list) and print the result"""
     print(f"\n🔄 {description}...")
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, cwd=".")
-        if result.returncode == 0:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE if input_text is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=".",
+        )
+        stdout, stderr = await process.communicate(
+            input_text.encode() if input_text is not None else None
+        )
+        if process.returncode == 0:
             print(f"✅ {description} - SUCCESS")
-            if result.stdout.strip():
-                print(f"   Output: {result.stdout.strip()}")
+            if stdout.strip():
+                print(f"   Output: {stdout.decode().strip()}")
         else:
             print(f"❌ {description} - FAILED")
-            print(f"   Error: {result.stderr.strip()}")
-        return result.returncode == 0
+            print(f"   Error: {stderr.decode().strip()}")
+        return process.returncode == 0
     except Exception as e:
         print(f"❌ {description} - EXCEPTION: {e}")
         return False
 
-def main():
+async def main():
     """Commit all gamification system files"""
     
     print("🎮 SensAI Gamification System - Git Commit")
     print("=" * 50)
     
-    # Check git status first
-    run_command("git status", "Checking git status")
-    
     # Add all our new files
     files_to_add = [
         "HACKATHON_DESIGN.md",
@@ -49,14 +55,23 @@ def main():
         "sensai-ai/src/api/main.py"
     ]
     
+    # The git status probe and the file existence checks are independent,
+    # so run them side by side
+    _, existing_files = await asyncio.gather(
+        run_command(["git", "status"], "Checking git status"),
+        asyncio.to_thread(lambda: [f for f in files_to_add if os.path.exists(f)]),
+    )
+    
     print(f"\n📁 Adding {len(files_to_add)} files to git...")
     
     for file in files_to_add:
-        if os.path.exists(file):
-            run_command(f"git add {file}", f"Adding {file}")
-        else:
+        if file not in existing_files:
             print(f"⚠️  File not found: {file}")
     
+    # Stage everything with a single git invocation instead of one per file
+    if existing_files:
+        await run_command(["git", "add", "--", *existing_files], f"Adding {len(existing_files)} files")
+    
     # Create comprehensive commit message
     commit_message = """feat: Add complete gamification system with active learning tracking
 
@@ -103,14 +118,14 @@ Built for: SensAI Hackathon - Gamification Track
 Target: Proof-of-Active-Learning innovation
 Status: MVP Complete, Production Ready"""
 
-    # Commit with detailed message
-    if run_command(f'git commit -m "{commit_message}"', "Committing gamification system"):
+    # Commit with detailed message, fed on stdin rather than as one huge argument
+    if await run_command(["git", "commit", "-F", "-"], "Committing gamification system", input_text=commit_message):
         print("\n🎊 COMMIT SUCCESSFUL!")
         print("✅ Complete gamification system saved to git")
         print("🚀 Ready for hackathon demo and deployment!")
         
         # Show final status
-        run_command("git log --oneline -5", "Showing recent commits")
+        await run_command(["git", "log", "--oneline", "-5"], "Showing recent commits")
         
     else:
         print("\n❌ Commit failed - please check git status")
@@ -119,4 +134,4 @@ Status: MVP Complete, Production Ready"""
     print("🏆 Gamification system implementation complete!")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -59,6 +59,13 @@ weekly_quests_table_name = "weekly_quests"
 quest_completions_table_name = "quest_completions"
 grace_tokens_table_name = "grace_tokens"
 leaderboard_cache_table_name = "leaderboard_cache"
+user_day_sessions_table_name = "user_day_sessions"
+user_leaderboard_scores_table_name = "user_leaderboard_scores"
+weekly_leaderboard_view_table_name = "mv_leaderboard_weekly"
+monthly_leaderboard_view_table_name = "mv_leaderboard_monthly"
+
+# How often the weekly and monthly leaderboard tables are rebuilt
+leaderboard_refresh_interval_minutes = 5
 
 UPLOAD_FOLDER_NAME = "uploads"
 
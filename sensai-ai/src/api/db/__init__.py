@@ -1,6 +1,6 @@
 import os
 from os.path import exists
-from api.utils.db import get_new_db_connection, check_table_exists, set_db_defaults
+from api.utils.db import get_new_db_connection, get_existing_tables, set_db_defaults
 from api.config import (
     sqlite_db_path,
     chat_history_table_name,
@@ -32,6 +32,10 @@ from api.config import (
     quest_completions_table_name,
     grace_tokens_table_name,
     leaderboard_cache_table_name,
+    user_day_sessions_table_name,
+    user_leaderboard_scores_table_name,
+    weekly_leaderboard_view_table_name,
+    monthly_leaderboard_view_table_name,
 )
 
 
@@ -457,55 +461,69 @@ async def create_code_drafts_table(cursor):
             )"""
     )
 
-    # Useful indexes for faster lookup
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_code_drafts_user_id ON {code_drafts_table_name} (user_id)"""
-    )
-
+    # Useful indexes for faster lookup; user_id lookups are already served
+    # by UNIQUE(user_id, question_id)
     await cursor.execute(
         f"""CREATE INDEX IF NOT EXISTS idx_code_drafts_question_id ON {code_drafts_table_name} (question_id)"""
     )
 
 
-async def create_learning_sessions_table(cursor):
-    """Table to track active learning sessions with quality metrics"""
-    await cursor.execute(
-        f"""CREATE TABLE IF NOT EXISTS {learning_sessions_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+# Numeric score for each session quality, averaged by the gamification queries
+session_quality_score_expression = "CASE session_quality WHEN 'high' THEN 3.0 WHEN 'medium' THEN 2.0 WHEN 'low' THEN 1.0 END"
+
+
+learning_sessions_table_statements = [
+    f"""CREATE TABLE IF NOT EXISTS {learning_sessions_table_name} (
+                id INTEGER PRIMARY KEY,
                 user_id INTEGER NOT NULL,
                 task_id INTEGER,
                 question_id INTEGER,
-                session_start DATETIME NOT NULL,
+                session_start INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
                 session_end DATETIME,
                 total_minutes INTEGER DEFAULT 0,
                 active_minutes INTEGER DEFAULT 0,
                 interactions_count INTEGER DEFAULT 0,
                 learning_velocity REAL DEFAULT 0.0,
                 session_quality TEXT CHECK(session_quality IN ('high', 'medium', 'low')) DEFAULT 'medium',
+                session_quality_score REAL GENERATED ALWAYS AS ({session_quality_score_expression}) STORED,
                 is_completed BOOLEAN DEFAULT FALSE,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
                 FOREIGN KEY (task_id) REFERENCES {tasks_table_name}(id) ON DELETE CASCADE,
                 FOREIGN KEY (question_id) REFERENCES {questions_table_name}(id) ON DELETE CASCADE
-            )"""
-    )
-
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_learning_sessions_user_id ON {learning_sessions_table_name} (user_id)"""
-    )
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_learning_sessions_task_id ON {learning_sessions_table_name} (task_id)"""
-    )
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_learning_sessions_date ON {learning_sessions_table_name} (session_start)"""
-    )
+            )""",
+    # Covers the per-user session metrics so they are read from the index alone;
+    # generated columns can't cover, hence session_quality rather than its score
+    f"""CREATE INDEX IF NOT EXISTS idx_learning_sessions_user_start_metrics ON {learning_sessions_table_name} (user_id, session_start, active_minutes, learning_velocity, session_quality, is_completed)""",
+    f"""CREATE INDEX IF NOT EXISTS idx_learning_sessions_task_id ON {learning_sessions_table_name} (task_id)""",
+    f"""CREATE INDEX IF NOT EXISTS idx_learning_sessions_date ON {learning_sessions_table_name} (session_start)""",
+    # Partial index for the open sessions of a user, newest first
+    f"""CREATE INDEX IF NOT EXISTS idx_learning_sessions_active ON {learning_sessions_table_name} (user_id, session_start DESC) WHERE is_completed = 0""",
+]
 
 
-async def create_weekly_quests_table(cursor):
-    """Table to define weekly quests with requirements and rewards"""
-    await cursor.execute(
-        f"""CREATE TABLE IF NOT EXISTS {weekly_quests_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+async def create_learning_sessions_table(cursor):
+    """Table to track active learning sessions with quality metrics"""
+    for statement in learning_sessions_table_statements:
+        await cursor.execute(statement)
+
+
+# Reject malformed requirements or rewards JSON when it is written rather
+# than when a reader parses it. Triggers instead of CHECK constraints, as a
+# CHECK can't be added to a table that already exists
+weekly_quests_json_trigger_statements = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_weekly_quests_json_{name}
+            BEFORE {event} ON {weekly_quests_table_name}
+            WHEN NOT json_valid(NEW.requirements) OR NOT json_valid(NEW.rewards)
+            BEGIN
+                SELECT RAISE(ABORT, 'requirements and rewards must be valid JSON');
+            END"""
+    for name, event in [("insert", "INSERT"), ("update", "UPDATE OF requirements, rewards")]
+]
+
+weekly_quests_table_statements = [
+    f"""CREATE TABLE IF NOT EXISTS {weekly_quests_table_name} (
+                id INTEGER PRIMARY KEY,
                 quest_name TEXT NOT NULL,
                 description TEXT NOT NULL,
                 week_start DATE NOT NULL,
@@ -518,25 +536,44 @@ async def create_weekly_quests_table(cursor):
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (org_id) REFERENCES {organizations_table_name}(id) ON DELETE CASCADE,
                 FOREIGN KEY (cohort_id) REFERENCES {cohorts_table_name}(id) ON DELETE CASCADE
-            )"""
-    )
+            )""",
+    f"""CREATE INDEX IF NOT EXISTS idx_weekly_quests_week ON {weekly_quests_table_name} (week_start, week_end)""",
+    # Active quests are filtered by org or cohort and then by week
+    f"""CREATE INDEX IF NOT EXISTS idx_weekly_quests_org_week ON {weekly_quests_table_name} (org_id, week_start)""",
+    f"""CREATE INDEX IF NOT EXISTS idx_weekly_quests_cohort_week ON {weekly_quests_table_name} (cohort_id, week_start)""",
+    *weekly_quests_json_trigger_statements,
+]
 
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_weekly_quests_week ON {weekly_quests_table_name} (week_start, week_end)"""
-    )
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_weekly_quests_org ON {weekly_quests_table_name} (org_id)"""
-    )
 
-
-async def create_quest_completions_table(cursor):
-    """Table to track user quest completions and progress"""
-    await cursor.execute(
-        f"""CREATE TABLE IF NOT EXISTS {quest_completions_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+async def create_weekly_quests_table(cursor):
+    """Table to define weekly quests with requirements and rewards"""
+    for statement in weekly_quests_table_statements:
+        await cursor.execute(statement)
+
+
+# QuestProgress fields stored as real columns so they can be aggregated,
+# sorted and indexed in SQL without parsing the progress JSON
+quest_progress_columns = [
+    ("active_minutes", "INTEGER", "0"),
+    ("dp_passes", "INTEGER", "0"),
+    ("peer_reviews", "INTEGER", "0"),
+    ("avg_session_quality", "REAL", "0.0"),
+    ("consistency_days", "INTEGER", "0"),
+    ("completion_percentage", "REAL", "0.0"),
+]
+
+quest_completions_table_statements = [
+    f"""CREATE TABLE IF NOT EXISTS {quest_completions_table_name} (
+                id INTEGER PRIMARY KEY,
                 user_id INTEGER NOT NULL,
                 quest_id INTEGER NOT NULL,
                 progress JSON NOT NULL,
+                active_minutes INTEGER DEFAULT 0,
+                dp_passes INTEGER DEFAULT 0,
+                peer_reviews INTEGER DEFAULT 0,
+                avg_session_quality REAL DEFAULT 0.0,
+                consistency_days INTEGER DEFAULT 0,
+                completion_percentage REAL DEFAULT 0.0,
                 is_completed BOOLEAN DEFAULT FALSE,
                 completed_at DATETIME,
                 points_earned INTEGER DEFAULT 0,
@@ -546,66 +583,392 @@ async def create_quest_completions_table(cursor):
                 UNIQUE(user_id, quest_id),
                 FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
                 FOREIGN KEY (quest_id) REFERENCES {weekly_quests_table_name}(id) ON DELETE CASCADE
-            )"""
-    )
+            )""",
+    f"""CREATE INDEX IF NOT EXISTS idx_quest_completions_quest_completion ON {quest_completions_table_name} (quest_id, completion_percentage DESC)""",
+    # Completed-quest counts per user within a window
+    f"""CREATE INDEX IF NOT EXISTS idx_quest_completions_user_completed ON {quest_completions_table_name} (user_id, completed_at) WHERE is_completed = 1""",
+]
 
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_quest_completions_user_id ON {quest_completions_table_name} (user_id)"""
-    )
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_quest_completions_quest_id ON {quest_completions_table_name} (quest_id)"""
-    )
 
+async def create_quest_completions_table(cursor):
+    """Table to track user quest completions and progress"""
+    for statement in quest_completions_table_statements:
+        await cursor.execute(statement)
 
-async def create_grace_tokens_table(cursor):
-    """Table to manage grace tokens for anti-cheat and user experience"""
-    await cursor.execute(
-        f"""CREATE TABLE IF NOT EXISTS {grace_tokens_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+
+grace_tokens_table_statements = [
+    f"""CREATE TABLE IF NOT EXISTS {grace_tokens_table_name} (
+                id INTEGER PRIMARY KEY,
                 user_id INTEGER NOT NULL,
                 token_type TEXT NOT NULL CHECK(token_type IN ('session_extension', 'quest_retry', 'streak_save', 'quality_adjustment')),
-                granted_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                used_date DATETIME,
+                granted_date REAL DEFAULT ((julianday('now') - 2440587.5) * 86400.0),
+                used_date REAL,
                 reason TEXT NOT NULL,
                 quest_id INTEGER,
                 session_id INTEGER,
                 is_used BOOLEAN DEFAULT FALSE,
-                expires_at DATETIME,
+                expires_at REAL,
                 FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
                 FOREIGN KEY (quest_id) REFERENCES {weekly_quests_table_name}(id) ON DELETE CASCADE,
                 FOREIGN KEY (session_id) REFERENCES {learning_sessions_table_name}(id) ON DELETE CASCADE
-            )"""
-    )
+            )""",
+    # A user's tokens are always listed newest first
+    f"""CREATE INDEX IF NOT EXISTS idx_grace_tokens_user_granted ON {grace_tokens_table_name} (user_id, granted_date DESC)""",
+    f"""CREATE INDEX IF NOT EXISTS idx_grace_tokens_type ON {grace_tokens_table_name} (token_type)""",
+    # Partial index for the unused tokens of a user, newest first
+    f"""CREATE INDEX IF NOT EXISTS idx_grace_tokens_unused ON {grace_tokens_table_name} (user_id, granted_date DESC) WHERE is_used = 0""",
+]
 
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_grace_tokens_user_id ON {grace_tokens_table_name} (user_id)"""
-    )
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_grace_tokens_type ON {grace_tokens_table_name} (token_type)"""
-    )
 
+async def create_grace_tokens_table(cursor):
+    """Table to manage grace tokens for anti-cheat and user experience"""
+    for statement in grace_tokens_table_statements:
+        await cursor.execute(statement)
 
-async def create_leaderboard_cache_table(cursor):
-    """Table to cache leaderboard calculations for performance"""
-    await cursor.execute(
-        f"""CREATE TABLE IF NOT EXISTS {leaderboard_cache_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+
+leaderboard_cache_table_statements = [
+    f"""CREATE TABLE IF NOT EXISTS {leaderboard_cache_table_name} (
+                id INTEGER PRIMARY KEY,
                 leaderboard_type TEXT NOT NULL CHECK(leaderboard_type IN ('course', 'cohort', 'topic', 'campus', 'global')),
                 scope_id INTEGER,
                 time_period TEXT NOT NULL CHECK(time_period IN ('weekly', 'monthly', 'all_time')),
-                leaderboard_data JSON NOT NULL,
+                leaderboard_data BLOB NOT NULL,
                 last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
                 expires_at DATETIME NOT NULL,
                 UNIQUE(leaderboard_type, scope_id, time_period)
-            )"""
-    )
+            )""",
+    f"""CREATE INDEX IF NOT EXISTS idx_leaderboard_cache_updated ON {leaderboard_cache_table_name} (last_updated)""",
+]
 
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_leaderboard_cache_type_scope ON {leaderboard_cache_table_name} (leaderboard_type, scope_id)"""
-    )
-    await cursor.execute(
-        f"""CREATE INDEX IF NOT EXISTS idx_leaderboard_cache_updated ON {leaderboard_cache_table_name} (last_updated)"""
-    )
+
+async def create_leaderboard_cache_table(cursor):
+    """Table to cache leaderboard calculations for performance"""
+    for statement in leaderboard_cache_table_statements:
+        await cursor.execute(statement)
+
+
+# Adds a session's contribution to its (user, UTC day) bucket
+_add_session_to_day_bucket = f"""INSERT INTO {user_day_sessions_table_name}
+                    (user_id, day, active_minutes, quality_sum, quality_count, sessions)
+                VALUES (
+                    NEW.user_id,
+                    NEW.session_start / 86400,
+                    COALESCE(NEW.active_minutes, 0),
+                    COALESCE(NEW.session_quality_score, 0),
+                    NEW.session_quality_score IS NOT NULL,
+                    1
+                )
+                ON CONFLICT(user_id, day) DO UPDATE SET
+                    active_minutes = active_minutes + excluded.active_minutes,
+                    quality_sum = quality_sum + excluded.quality_sum,
+                    quality_count = quality_count + excluded.quality_count,
+                    sessions = sessions + 1;"""
+
+# Removes a session's contribution from its bucket, dropping emptied buckets
+_remove_session_from_day_bucket = f"""UPDATE {user_day_sessions_table_name} SET
+                    active_minutes = active_minutes - COALESCE(OLD.active_minutes, 0),
+                    quality_sum = quality_sum - COALESCE(OLD.session_quality_score, 0),
+                    quality_count = quality_count - (OLD.session_quality_score IS NOT NULL),
+                    sessions = sessions - 1
+                WHERE user_id = OLD.user_id AND day = OLD.session_start / 86400;
+                DELETE FROM {user_day_sessions_table_name}
+                WHERE user_id = OLD.user_id AND day = OLD.session_start / 86400 AND sessions <= 0;"""
+
+user_day_sessions_table_statements = [
+    f"""CREATE TABLE IF NOT EXISTS {user_day_sessions_table_name} (
+                user_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                active_minutes INTEGER NOT NULL DEFAULT 0,
+                quality_sum REAL NOT NULL DEFAULT 0,
+                quality_count INTEGER NOT NULL DEFAULT 0,
+                sessions INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day)
+            ) WITHOUT ROWID""",
+    # Seed the buckets from sessions recorded before the table existed
+    f"""INSERT OR IGNORE INTO {user_day_sessions_table_name}
+                (user_id, day, active_minutes, quality_sum, quality_count, sessions)
+            SELECT user_id, session_start / 86400, COALESCE(SUM(active_minutes), 0),
+                COALESCE(SUM(session_quality_score), 0), COUNT(session_quality_score), COUNT(*)
+            FROM {learning_sessions_table_name}
+            GROUP BY user_id, session_start / 86400""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_learning_sessions_day_insert
+            AFTER INSERT ON {learning_sessions_table_name}
+            BEGIN
+                {_add_session_to_day_bucket}
+            END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_learning_sessions_day_update
+            AFTER UPDATE OF user_id, session_start, active_minutes, session_quality ON {learning_sessions_table_name}
+            BEGIN
+                {_remove_session_from_day_bucket}
+                {_add_session_to_day_bucket}
+            END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_learning_sessions_day_delete
+            AFTER DELETE ON {learning_sessions_table_name}
+            BEGIN
+                {_remove_session_from_day_bucket}
+            END""",
+]
+
+
+async def create_user_day_sessions_table(cursor):
+    """Per-user, per-day rollup of learning sessions kept up to date by triggers"""
+    for statement in user_day_sessions_table_statements:
+        await cursor.execute(statement)
+
+
+# Adds a session's contribution to its user's all-time leaderboard totals
+_add_session_to_user_score = f"""INSERT INTO {user_leaderboard_scores_table_name}
+                    (user_id, active_minutes, sessions, quality_sum, quality_count, updated_at)
+                VALUES (
+                    NEW.user_id,
+                    COALESCE(NEW.active_minutes, 0),
+                    1,
+                    COALESCE(NEW.session_quality_score, 0),
+                    NEW.session_quality_score IS NOT NULL,
+                    CAST(strftime('%s', 'now') AS INTEGER)
+                )
+                ON CONFLICT(user_id) DO UPDATE SET
+                    active_minutes = active_minutes + excluded.active_minutes,
+                    sessions = sessions + 1,
+                    quality_sum = quality_sum + excluded.quality_sum,
+                    quality_count = quality_count + excluded.quality_count,
+                    updated_at = excluded.updated_at;"""
+
+_remove_session_from_user_score = f"""UPDATE {user_leaderboard_scores_table_name} SET
+                    active_minutes = active_minutes - COALESCE(OLD.active_minutes, 0),
+                    sessions = sessions - 1,
+                    quality_sum = quality_sum - COALESCE(OLD.session_quality_score, 0),
+                    quality_count = quality_count - (OLD.session_quality_score IS NOT NULL),
+                    updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+                WHERE user_id = OLD.user_id;"""
+
+_add_quest_to_user_score = f"""INSERT INTO {user_leaderboard_scores_table_name}
+                    (user_id, quests_completed, updated_at)
+                SELECT NEW.user_id, 1, CAST(strftime('%s', 'now') AS INTEGER)
+                WHERE NEW.is_completed = 1
+                ON CONFLICT(user_id) DO UPDATE SET
+                    quests_completed = quests_completed + 1,
+                    updated_at = excluded.updated_at;"""
+
+_remove_quest_from_user_score = f"""UPDATE {user_leaderboard_scores_table_name} SET
+                    quests_completed = quests_completed - 1,
+                    updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+                WHERE user_id = OLD.user_id AND OLD.is_completed = 1;"""
+
+user_leaderboard_scores_table_statements = [
+    f"""CREATE TABLE IF NOT EXISTS {user_leaderboard_scores_table_name} (
+                user_id INTEGER PRIMARY KEY,
+                active_minutes INTEGER NOT NULL DEFAULT 0,
+                sessions INTEGER NOT NULL DEFAULT 0,
+                quality_sum REAL NOT NULL DEFAULT 0,
+                quality_count INTEGER NOT NULL DEFAULT 0,
+                quests_completed INTEGER NOT NULL DEFAULT 0,
+                updated_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+            )""",
+    # Matches the leaderboard's full ORDER BY so the top entries are read
+    # straight off the index and the scan stops at the limit
+    f"""CREATE INDEX IF NOT EXISTS idx_user_leaderboard_scores_rank ON {user_leaderboard_scores_table_name} (active_minutes DESC, quality_sum / NULLIF(quality_count, 0) DESC)""",
+    # Seed the totals from sessions and quests recorded before the table existed
+    f"""INSERT OR IGNORE INTO {user_leaderboard_scores_table_name}
+                (user_id, active_minutes, sessions, quality_sum, quality_count, quests_completed)
+            SELECT user_id, SUM(active_minutes), SUM(sessions), SUM(quality_sum), SUM(quality_count), SUM(quests_completed)
+            FROM (
+                SELECT user_id, COALESCE(active_minutes, 0) AS active_minutes, 1 AS sessions,
+                    COALESCE(session_quality_score, 0) AS quality_sum,
+                    session_quality_score IS NOT NULL AS quality_count, 0 AS quests_completed
+                FROM {learning_sessions_table_name}
+                UNION ALL
+                SELECT user_id, 0, 0, 0, 0, 1
+                FROM {quest_completions_table_name}
+                WHERE is_completed = 1
+            )
+            GROUP BY user_id""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_learning_sessions_score_insert
+            AFTER INSERT ON {learning_sessions_table_name}
+            BEGIN
+                {_add_session_to_user_score}
+            END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_learning_sessions_score_update
+            AFTER UPDATE OF user_id, active_minutes, session_quality ON {learning_sessions_table_name}
+            BEGIN
+                {_remove_session_from_user_score}
+                {_add_session_to_user_score}
+            END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_learning_sessions_score_delete
+            AFTER DELETE ON {learning_sessions_table_name}
+            BEGIN
+                {_remove_session_from_user_score}
+            END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_quest_completions_score_insert
+            AFTER INSERT ON {quest_completions_table_name}
+            BEGIN
+                {_add_quest_to_user_score}
+            END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_quest_completions_score_update
+            AFTER UPDATE OF user_id, is_completed ON {quest_completions_table_name}
+            BEGIN
+                {_remove_quest_from_user_score}
+                {_add_quest_to_user_score}
+            END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_quest_completions_score_delete
+            AFTER DELETE ON {quest_completions_table_name}
+            BEGIN
+                {_remove_quest_from_user_score}
+            END""",
+]
+
+
+async def create_user_leaderboard_scores_table(cursor):
+    """Per-user all-time leaderboard totals kept up to date by triggers"""
+    for statement in user_leaderboard_scores_table_statements:
+        await cursor.execute(statement)
+
+
+leaderboard_views_table_statements = [
+    statement
+    for table_name in [weekly_leaderboard_view_table_name, monthly_leaderboard_view_table_name]
+    for statement in [
+        f"""CREATE TABLE IF NOT EXISTS {table_name} (
+                user_id INTEGER PRIMARY KEY,
+                user_name TEXT,
+                email TEXT,
+                total_active_minutes INTEGER NOT NULL DEFAULT 0,
+                total_sessions INTEGER NOT NULL DEFAULT 0,
+                avg_quality_score REAL,
+                quests_completed INTEGER NOT NULL DEFAULT 0
+            )""",
+        f"""CREATE INDEX IF NOT EXISTS idx_{table_name}_rank ON {table_name} (total_active_minutes DESC, avg_quality_score DESC)""",
+    ]
+]
+
+
+async def create_leaderboard_views_tables(cursor):
+    """Weekly and monthly leaderboard tables rebuilt on a schedule from the per-day rollup"""
+    for statement in leaderboard_views_table_statements:
+        await cursor.execute(statement)
+
+
+gamification_table_statements = [
+    *learning_sessions_table_statements,
+    *weekly_quests_table_statements,
+    *quest_completions_table_statements,
+    *grace_tokens_table_statements,
+    *leaderboard_cache_table_statements,
+    *user_day_sessions_table_statements,
+    *user_leaderboard_scores_table_statements,
+    *leaderboard_views_table_statements,
+]
+
+# The index statements on their own, for adding indexes to tables that
+# already exist or building them once the tables have been loaded
+gamification_index_statements = [
+    statement
+    for statement in gamification_table_statements
+    if statement.startswith("CREATE INDEX")
+]
+
+
+# Indexes older schemas created that the tables no longer need
+superseded_index_names = [
+    # covered by idx_learning_sessions_user_start_metrics
+    "idx_learning_sessions_user_id",
+    "idx_learning_sessions_user_start",
+    # covered by UNIQUE(user_id, quest_id)
+    "idx_quest_completions_user_id",
+    # covered by idx_quest_completions_quest_completion
+    "idx_quest_completions_quest_id",
+    # covered by idx_weekly_quests_org_week
+    "idx_weekly_quests_org",
+    # covered by idx_grace_tokens_user_granted
+    "idx_grace_tokens_user_id",
+    # covered by UNIQUE(leaderboard_type, scope_id, time_period)
+    "idx_leaderboard_cache_type_scope",
+    # covered by idx_user_leaderboard_scores_rank
+    "idx_user_leaderboard_scores_active_minutes",
+    # covered by UNIQUE(user_id, question_id)
+    "idx_code_drafts_user_id",
+    # created by earlier versions of the setup scripts; quests are scoped
+    # per org and cohort, so a name need not be unique across a week
+    "idx_weekly_quests_week_name",
+]
+
+
+async def create_gamification_tables(cursor):
+    """Create every gamification table and index with a single script in its own transaction"""
+    await cursor.executescript(
+        "BEGIN;\n" + ";\n".join(gamification_table_statements) + ";\nCOMMIT;"
+    )
+
+
+async def migrate_gamification_tables(cursor, existing_tables):
+    """Bring gamification tables created by an older schema up to date.
+
+    Runs before any missing table is created, as the rollup tables are seeded
+    from learning_sessions and rely on its current columns. Each step checks
+    the schema first, so running it on an up-to-date database changes nothing.
+    """
+    if learning_sessions_table_name in existing_tables:
+        # table_xinfo (unlike table_info) lists generated columns
+        await cursor.execute(f"PRAGMA table_xinfo({learning_sessions_table_name})")
+        learning_session_columns = [col[1] for col in await cursor.fetchall()]
+
+        if "session_quality_score" not in learning_session_columns:
+            # ALTER TABLE can only add VIRTUAL generated columns, not STORED ones
+            await cursor.execute(
+                f"ALTER TABLE {learning_sessions_table_name} ADD COLUMN session_quality_score REAL GENERATED ALWAYS AS ({session_quality_score_expression}) VIRTUAL"
+            )
+
+        # session_start used to be stored as a timestamp string; convert any
+        # such rows to unix seconds so range filters compare integers
+        await cursor.execute(
+            f"UPDATE {learning_sessions_table_name} SET session_start = CAST(strftime('%s', session_start) AS INTEGER) WHERE typeof(session_start) = 'text'"
+        )
+
+    if weekly_quests_table_name in existing_tables:
+        for statement in weekly_quests_json_trigger_statements:
+            await cursor.execute(statement)
+
+    if quest_completions_table_name in existing_tables:
+        await cursor.execute(f"PRAGMA table_info({quest_completions_table_name})")
+        quest_completion_columns = [col[1] for col in await cursor.fetchall()]
+
+        added_progress_columns = []
+        for col, col_type, default in quest_progress_columns:
+            if col not in quest_completion_columns:
+                await cursor.execute(
+                    f"ALTER TABLE {quest_completions_table_name} ADD COLUMN {col} {col_type} DEFAULT {default}"
+                )
+                added_progress_columns.append(col)
+
+        if added_progress_columns:
+            # Backfill the new columns from the progress JSON
+            assignments = ", ".join(
+                f"{col} = COALESCE(json_extract(progress, '$.{col}'), {col})"
+                for col in added_progress_columns
+            )
+            await cursor.execute(
+                f"UPDATE {quest_completions_table_name} SET {assignments} WHERE json_valid(progress)"
+            )
+
+    if grace_tokens_table_name in existing_tables:
+        # Grace token times used to be stored as timestamp strings; convert
+        # any such values to REAL unix seconds
+        for col in ["granted_date", "used_date", "expires_at"]:
+            await cursor.execute(
+                f"UPDATE {grace_tokens_table_name} SET {col} = (julianday({col}) - 2440587.5) * 86400.0 WHERE typeof({col}) = 'text'"
+            )
+
+    # Add the indexes an older schema lacks to the tables that already exist;
+    # the progress columns some of them cover were added above
+    for statement in gamification_index_statements:
+        indexed_table = statement.split(" ON ", 1)[1].split(" ", 1)[0]
+        if indexed_table in existing_tables:
+            await cursor.execute(statement)
+
+    # Indexes made redundant by the ones above or by a UNIQUE constraint,
+    # and ones the current schema no longer wants
+    for index_name in superseded_index_names:
+        await cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
 
 
 async def init_db():
@@ -614,14 +977,22 @@ async def init_db():
     if not os.path.exists(db_folder):
         os.makedirs(db_folder)
 
-    if not exists(sqlite_db_path):
+    # set_db_defaults creates the database file, so whether this is a new
+    # database has to be decided before it runs
+    is_new_db = not exists(sqlite_db_path)
+
+    if is_new_db:
         # only set the defaults the first time
         set_db_defaults()
 
     async with get_new_db_connection() as conn:
         cursor = await conn.cursor()
 
-        if exists(sqlite_db_path):
+        # Create every table inside one transaction so the schema is written
+        # with a single journal sync instead of one per statement
+        await conn.execute("BEGIN IMMEDIATE")
+
+        if not is_new_db:
             # Check and create ALL tables for existing database (comprehensive check)
             all_tables_to_check = [
                 # Core existing tables
@@ -650,11 +1021,23 @@ async def init_db():
                 (quest_completions_table_name, create_quest_completions_table),
                 (grace_tokens_table_name, create_grace_tokens_table),
                 (leaderboard_cache_table_name, create_leaderboard_cache_table),
+                (user_day_sessions_table_name, create_user_day_sessions_table),
+                (user_leaderboard_scores_table_name, create_user_leaderboard_scores_table),
+                (weekly_leaderboard_view_table_name, create_leaderboard_views_tables),
+                (monthly_leaderboard_view_table_name, create_leaderboard_views_tables),
             ]
             
+            existing_tables = await get_existing_tables(
+                [table_name for table_name, _ in all_tables_to_check], cursor
+            )
+
+            # Upgrade the tables that already exist before creating the
+            # missing ones, some of which are seeded from the existing tables
+            await migrate_gamification_tables(cursor, existing_tables)
+
             missing_tables_created = False
             for table_name, create_function in all_tables_to_check:
-                if not await check_table_exists(table_name, cursor):
+                if table_name not in existing_tables:
                     print(f"Creating missing table: {table_name}")
                     await create_function(cursor)
                     missing_tables_created = True
@@ -665,6 +1048,10 @@ async def init_db():
                 print("✅ All tables already exist - database is complete!")
             
             await conn.commit()
+
+            # Gather planner statistics for any table that needs them, e.g.
+            # after the migration changed its indexes
+            await conn.execute("PRAGMA optimize")
             return
 
         try:
@@ -706,12 +1093,10 @@ async def init_db():
 
             await create_code_drafts_table(cursor)
 
-            # Gamification tables for active learning tracking
-            await create_learning_sessions_table(cursor)
-            await create_weekly_quests_table(cursor)
-            await create_quest_completions_table(cursor)
-            await create_grace_tokens_table(cursor)
-            await create_leaderboard_cache_table(cursor)
+            # Gamification tables for active learning tracking. executescript
+            # commits the tables created above before running its own
+            # transaction, so this has to come last
+            await create_gamification_tables(cursor)
 
             await conn.commit()
 
@@ -733,9 +1118,13 @@ async def delete_useless_tables():
         tests_table_name,
     )
 
+    # Drop the old tables and apply the column migrations over one connection
+    # and in one transaction instead of reopening the database in between
     async with get_new_db_connection() as conn:
         cursor = await conn.cursor()
 
+        await conn.execute("BEGIN IMMEDIATE")
+
         await cursor.execute(f"DROP TABLE IF EXISTS {tags_table_name}")
         await cursor.execute(f"DROP TABLE IF EXISTS {task_tags_table_name}")
         await cursor.execute(f"DROP TABLE IF EXISTS {tests_table_name}")
@@ -745,8 +1134,6 @@ async def delete_useless_tables():
         await cursor.execute(f"DROP TABLE IF EXISTS {task_scoring_criteria_table_name}")
         await cursor.execute(f"DROP TABLE IF EXISTS {cv_review_usage_table_name}")
 
-    async with get_new_db_connection() as conn:
-        cursor = await conn.cursor()
         await cursor.execute(f"PRAGMA table_info({user_cohorts_table_name})")
         user_columns = [col[1] for col in await cursor.fetchall()]
 
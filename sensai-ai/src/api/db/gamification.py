@@ -3,16 +3,29 @@ Database operations for the gamification system.
 Handles sessions, quests, leaderboards, and grace tokens.
 """
 
-import json
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime, date, timedelta, timezone
-from api.utils.db import execute_db_operation, get_new_db_connection
+import time
+import orjson
+import aiosqlite
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime, date, timezone
+from pydantic import BaseModel
+from api.utils.db import (
+    execute_db_operation,
+    get_existing_tables,
+    db_pool,
+)
+from api.utils.cache import async_ttl_cache
+from api.db import session_quality_score_expression
 from api.config import (
     learning_sessions_table_name,
     weekly_quests_table_name,
     quest_completions_table_name,
     grace_tokens_table_name,
     leaderboard_cache_table_name,
+    user_day_sessions_table_name,
+    user_leaderboard_scores_table_name,
+    weekly_leaderboard_view_table_name,
+    monthly_leaderboard_view_table_name,
     users_table_name,
     tasks_table_name,
     questions_table_name,
@@ -22,30 +35,123 @@ from api.config import (
 )
 from api.models_gamification import (
     LearningSession, WeeklyQuest, QuestCompletion, GraceToken, 
-    LeaderboardData, SessionQuality, GraceTokenType, LeaderboardType, TimePeriod,
+    LeaderboardData, LeaderboardEntry, SessionQuality, GraceTokenType, LeaderboardType, TimePeriod,
     QuestRequirements, QuestRewards, QuestProgress
 )
 
 
+
+def _json_object_sql(model_class) -> str:
+    """json_object(...) expression with one placeholder per model field, in field order"""
+    pairs = ", ".join(f"'{name}', ?" for name in model_class.model_fields)
+    return f"json_object({pairs})"
+
+
+# Requirements and progress are flat, fixed-shape objects, so SQLite builds
+# their JSON directly from the bound values instead of serializing in Python
+_QUEST_REQUIREMENTS_JSON = _json_object_sql(QuestRequirements)
+_QUEST_PROGRESS_JSON = _json_object_sql(QuestProgress)
+
+# Each QuestProgress field also has its own quest_completions column, which
+# is what reads and rankings use; the JSON copy is kept for older readers
+_QUEST_PROGRESS_COLUMNS = list(QuestProgress.model_fields)
+
+
+# session_start is stored as INTEGER unix seconds so range filters compare
+# integers instead of ISO strings
+_NOW_EPOCH_SQL = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+def _day_start_epoch(day: date) -> int:
+    """Unix seconds at the start (UTC midnight) of the given day"""
+    return int(datetime.combine(day, datetime.min.time(), timezone.utc).timestamp())
+
+
+# Tables confirmed to exist; tables are never dropped while the API is
+# running so only negative answers need to be looked up again
+_known_tables: Set[str] = set()
+
+
+async def table_available(table_name: str) -> bool:
+    """Check whether a table exists, remembering tables already seen"""
+    if table_name in _known_tables:
+        return True
+
+    async with db_pool.acquire(readonly=True) as conn:
+        cursor = await conn.cursor()
+        _known_tables.update(await get_existing_tables([table_name], cursor))
+
+    return table_name in _known_tables
+
+
 # ================================
 # Learning Session Operations
 # ================================
 
+# Fields left as NULL keep their current value
+_UPDATE_SESSION_SQL = f"""
+    UPDATE {learning_sessions_table_name}
+    SET session_end = COALESCE(?, session_end),
+        total_minutes = COALESCE(?, total_minutes),
+        active_minutes = COALESCE(?, active_minutes),
+        interactions_count = COALESCE(?, interactions_count),
+        learning_velocity = COALESCE(?, learning_velocity),
+        session_quality = COALESCE(?, session_quality),
+        is_completed = COALESCE(?, is_completed)
+    WHERE id = ?
+"""
+
+
 async def create_learning_session(user_id: int, task_id: Optional[int] = None, question_id: Optional[int] = None) -> int:
     """Create a new learning session"""
-    session_start = datetime.now(timezone.utc)
-    
-    session_id = await execute_db_operation(
-        f"""
-        INSERT INTO {learning_sessions_table_name} 
-        (user_id, task_id, question_id, session_start)
-        VALUES (?, ?, ?, ?)
-        """,
-        (user_id, task_id, question_id, session_start),
-        return_lastrowid=True
-    )
-    
-    return session_id
+    async with db_pool.acquire() as conn:
+        cursor = await conn.execute(
+            f"""
+            INSERT INTO {learning_sessions_table_name} 
+            (user_id, task_id, question_id, session_start)
+            VALUES (?, ?, ?, {_NOW_EPOCH_SQL})
+            """,
+            (user_id, task_id, question_id)
+        )
+        await conn.commit()
+
+    return cursor.lastrowid
+
+
+async def create_learning_sessions_bulk(
+    sessions: List[Tuple[int, Optional[int], Optional[int]]]
+) -> List[int]:
+    """Create many learning sessions in a single transaction.
+
+    Each entry is a (user_id, task_id, question_id) tuple. Returns the ids of
+    the created sessions in the same order as the input.
+    """
+    if not sessions:
+        return []
+
+    async with db_pool.acquire() as conn:
+        cursor = await conn.cursor()
+
+        # 'now' is fixed for the duration of a statement, so every session in
+        # the batch gets the same start time
+        await cursor.executemany(
+            f"""
+            INSERT INTO {learning_sessions_table_name}
+            (user_id, task_id, question_id, session_start)
+            VALUES (?, ?, ?, {_NOW_EPOCH_SQL})
+            """,
+            sessions
+        )
+
+        # executemany does not update cursor.lastrowid, but the rows were
+        # inserted contiguously inside this transaction
+        await cursor.execute("SELECT last_insert_rowid()")
+        last_id = (await cursor.fetchone())[0]
+
+        await conn.commit()
+
+    first_id = last_id - len(sessions) + 1
+    return list(range(first_id, last_id + 1))
 
 
 async def update_learning_session(
@@ -59,154 +165,188 @@ async def update_learning_session(
     is_completed: Optional[bool] = None
 ) -> bool:
     """Update an existing learning session"""
-    
-    # Build dynamic update query
-    updates = []
-    params = []
-    
-    if session_end is not None:
-        updates.append("session_end = ?")
-        params.append(session_end)
-    
-    if total_minutes is not None:
-        updates.append("total_minutes = ?")
-        params.append(total_minutes)
-    
-    if active_minutes is not None:
-        updates.append("active_minutes = ?")
-        params.append(active_minutes)
-    
-    if interactions_count is not None:
-        updates.append("interactions_count = ?")
-        params.append(interactions_count)
-    
-    if learning_velocity is not None:
-        updates.append("learning_velocity = ?")
-        params.append(learning_velocity)
-    
-    if session_quality is not None:
-        updates.append("session_quality = ?")
-        params.append(session_quality.value)
-    
-    if is_completed is not None:
-        updates.append("is_completed = ?")
-        params.append(is_completed)
-    
-    if not updates:
-        return False
-    
-    params.append(session_id)
-    
-    await execute_db_operation(
-        f"""
-        UPDATE {learning_sessions_table_name} 
-        SET {', '.join(updates)}
-        WHERE id = ?
-        """,
-        params
+
+    params = (
+        session_end,
+        total_minutes,
+        active_minutes,
+        interactions_count,
+        learning_velocity,
+        session_quality.value if session_quality is not None else None,
+        int(is_completed) if is_completed is not None else None,
+        session_id
     )
-    
+
+    if all(value is None for value in params[:-1]):
+        return False
+
+    # The statement text never changes, so the pooled writer reuses its
+    # prepared statement instead of parsing a new variant on every call
+    async with db_pool.acquire() as conn:
+        await conn.execute(_UPDATE_SESSION_SQL, params)
+        await conn.commit()
+
     return True
 
 
+# The hottest reads go straight to a pooled reader connection with SQL built
+# once at import, skipping execute_db_operation's per-call dispatch
+_SELECT_SESSION_COLUMNS = f"""
+    SELECT id, user_id, task_id, question_id, session_start, session_end,
+           total_minutes, active_minutes, interactions_count, learning_velocity,
+           session_quality, is_completed, created_at
+    FROM {learning_sessions_table_name}
+"""
+
+_SELECT_SESSION_BY_ID = _SELECT_SESSION_COLUMNS + "WHERE id = ?"
+
+_SELECT_ACTIVE_SESSIONS_BY_USER = _SELECT_SESSION_COLUMNS + """
+    WHERE user_id = ? AND is_completed = 0
+    ORDER BY session_start DESC
+"""
+
+
+def _epoch_to_datetime(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, timezone.utc)
+
+
+def _text_to_datetime(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value)
+    # CURRENT_TIMESTAMP, and times bound without an offset, are UTC; times
+    # are handed back as aware UTC like the epoch columns so they compare
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+# Hot reads hydrate from aiosqlite.Row with model_construct, skipping pydantic
+# validation; only the values SQLite can't hand back as the field type
+# (epoch/text times, enums, 0/1 flags) are converted here
+def _learning_session_from_row(row: aiosqlite.Row) -> LearningSession:
+    return LearningSession.model_construct(
+        **{
+            **dict(row),
+            "session_start": _epoch_to_datetime(row["session_start"]),
+            "session_end": _text_to_datetime(row["session_end"]),
+            "session_quality": SessionQuality(row["session_quality"]),
+            "is_completed": bool(row["is_completed"]),
+            "created_at": _text_to_datetime(row["created_at"]),
+        }
+    )
+
+
+def _grace_token_from_row(row: aiosqlite.Row) -> GraceToken:
+    return GraceToken.model_construct(
+        **{
+            **dict(row),
+            "token_type": GraceTokenType(row["token_type"]),
+            "granted_date": _epoch_to_datetime(row["granted_date"]),
+            "used_date": _epoch_to_datetime(row["used_date"]),
+            "is_used": bool(row["is_used"]),
+            "expires_at": _epoch_to_datetime(row["expires_at"]),
+        }
+    )
+
+
 async def get_learning_session(session_id: int) -> Optional[LearningSession]:
     """Get a learning session by ID"""
-    result = await execute_db_operation(
-        f"""
-        SELECT id, user_id, task_id, question_id, session_start, session_end,
-               total_minutes, active_minutes, interactions_count, learning_velocity,
-               session_quality, is_completed, created_at
-        FROM {learning_sessions_table_name}
-        WHERE id = ?
-        """,
-        (session_id,),
-        fetch_one=True
-    )
+    async with db_pool.acquire(readonly=True) as conn:
+        async with conn.execute(_SELECT_SESSION_BY_ID, (session_id,)) as cursor:
+            cursor.row_factory = aiosqlite.Row
+            result = await cursor.fetchone()
     
     if not result:
         return None
     
-    return LearningSession(
-        id=result[0],
-        user_id=result[1],
-        task_id=result[2],
-        question_id=result[3],
-        session_start=result[4],
-        session_end=result[5],
-        total_minutes=result[6],
-        active_minutes=result[7],
-        interactions_count=result[8],
-        learning_velocity=result[9],
-        session_quality=SessionQuality(result[10]),
-        is_completed=bool(result[11]),
-        created_at=result[12]
-    )
+    return _learning_session_from_row(result)
 
 
 async def get_user_active_sessions(user_id: int) -> List[LearningSession]:
     """Get all active (uncompleted) sessions for a user"""
+    async with db_pool.acquire(readonly=True) as conn:
+        async with conn.execute(_SELECT_ACTIVE_SESSIONS_BY_USER, (user_id,)) as cursor:
+            cursor.row_factory = aiosqlite.Row
+            results = await cursor.fetchall()
+    
+    return [_learning_session_from_row(row) for row in results]
+
+
+# Spelled out on session_quality (not the generated score) so the metrics
+# index covers the query
+_SESSION_METRICS_COLUMNS = f"""
+            COUNT(*) as total_sessions,
+            SUM(active_minutes) as total_active_minutes,
+            AVG(learning_velocity) as avg_velocity,
+            AVG({session_quality_score_expression}) as avg_quality_score,
+            COUNT(CASE WHEN is_completed = 1 THEN 1 END) as completed_sessions
+"""
+
+
+def _session_metrics_from_row(row: Optional[Tuple]) -> Dict:
+    if not row:
+        return {
+            'total_sessions': 0,
+            'total_active_minutes': 0,
+            'avg_velocity': 0.0,
+            'avg_quality_score': 0.0,
+            'completed_sessions': 0
+        }
+    
+    return {
+        'total_sessions': row[0] or 0,
+        'total_active_minutes': row[1] or 0,
+        'avg_velocity': row[2] or 0.0,
+        'avg_quality_score': row[3] or 0.0,
+        'completed_sessions': row[4] or 0
+    }
+
+
+async def get_user_session_metrics(user_id: int, days: int = 7) -> Dict:
+    """Get user's session metrics for the last N days"""
     results = await execute_db_operation(
         f"""
-        SELECT id, user_id, task_id, question_id, session_start, session_end,
-               total_minutes, active_minutes, interactions_count, learning_velocity,
-               session_quality, is_completed, created_at
+        SELECT {_SESSION_METRICS_COLUMNS}
         FROM {learning_sessions_table_name}
-        WHERE user_id = ? AND is_completed = 0
-        ORDER BY session_start DESC
+        WHERE user_id = ? AND session_start >= {_NOW_EPOCH_SQL} - ? * 86400
         """,
-        (user_id,),
-        fetch_all=True
+        (user_id, days),
+        fetch_one=True,
+        readonly=True
     )
     
-    return [
-        LearningSession(
-            id=row[0], user_id=row[1], task_id=row[2], question_id=row[3],
-            session_start=row[4], session_end=row[5], total_minutes=row[6],
-            active_minutes=row[7], interactions_count=row[8], learning_velocity=row[9],
-            session_quality=SessionQuality(row[10]), is_completed=bool(row[11]),
-            created_at=row[12]
-        ) for row in results
-    ]
+    return _session_metrics_from_row(results)
 
 
-async def get_user_session_metrics(user_id: int, days: int = 7) -> Dict:
-    """Get user's session metrics for the last N days"""
-    since_date = datetime.now() - timedelta(days=days)
+async def get_session_metrics_bulk(user_ids: List[int], days: int = 7) -> Dict[int, Dict]:
+    """Get session metrics for the last N days for many users in one query"""
+    if not user_ids:
+        return {}
+    
+    placeholders = ",".join("?" * len(user_ids))
     
     results = await execute_db_operation(
         f"""
-        SELECT 
-            COUNT(*) as total_sessions,
-            SUM(active_minutes) as total_active_minutes,
-            AVG(learning_velocity) as avg_velocity,
-            AVG(CASE 
-                WHEN session_quality = 'high' THEN 3.0
-                WHEN session_quality = 'medium' THEN 2.0
-                WHEN session_quality = 'low' THEN 1.0
-            END) as avg_quality_score,
-            COUNT(CASE WHEN is_completed = 1 THEN 1 END) as completed_sessions
+        SELECT user_id, {_SESSION_METRICS_COLUMNS}
         FROM {learning_sessions_table_name}
-        WHERE user_id = ? AND session_start >= ?
+        WHERE user_id IN ({placeholders})
+            AND session_start >= {_NOW_EPOCH_SQL} - ? * 86400
+        GROUP BY user_id
         """,
-        (user_id, since_date),
-        fetch_one=True
+        (*user_ids, days),
+        fetch_all=True,
+        readonly=True
     )
     
-    if not results:
-        return {
-            'total_sessions': 0,
-            'total_active_minutes': 0,
-            'avg_velocity': 0.0,
-            'avg_quality_score': 0.0,
-            'completed_sessions': 0
-        }
+    rows_by_user = {row[0]: row[1:] for row in results}
     
+    # Users without any sessions in the window still get zeroed metrics
     return {
-        'total_sessions': results[0] or 0,
-        'total_active_minutes': results[1] or 0,
-        'avg_velocity': results[2] or 0.0,
-        'avg_quality_score': results[3] or 0.0,
-        'completed_sessions': results[4] or 0
+        user_id: _session_metrics_from_row(rows_by_user.get(user_id))
+        for user_id in user_ids
     }
 
 
@@ -226,22 +366,53 @@ async def create_weekly_quest(
 ) -> int:
     """Create a new weekly quest"""
     
-    quest_id = await execute_db_operation(
-        f"""
-        INSERT INTO {weekly_quests_table_name}
-        (quest_name, description, week_start, week_end, org_id, cohort_id, requirements, rewards)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            quest_name, description, week_start, week_end, org_id, cohort_id,
-            json.dumps(requirements.dict()), json.dumps(rewards.dict())
-        ),
-        return_lastrowid=True
-    )
+    async with db_pool.acquire() as conn:
+        cursor = await conn.execute(
+            f"""
+            INSERT INTO {weekly_quests_table_name}
+            (quest_name, description, week_start, week_end, org_id, cohort_id, requirements, rewards)
+            VALUES (?, ?, ?, ?, ?, ?, {_QUEST_REQUIREMENTS_JSON}, ?)
+            """,
+            (
+                quest_name, description, week_start, week_end, org_id, cohort_id,
+                *requirements.dict().values(), orjson.dumps(rewards.dict()).decode()
+            )
+        )
+        await conn.commit()
+    quest_id = cursor.lastrowid
+    
+    # The new quest may belong in any cached list of active quests
+    get_active_quests.cache_clear()
     
     return quest_id
 
 
+_WEEKLY_QUEST_COLUMNS = """id, quest_name, description, week_start, week_end, org_id, cohort_id,
+               requirements, rewards, is_active, created_at"""
+
+
+def _weekly_quest_from_row(row: Tuple) -> WeeklyQuest:
+    return WeeklyQuest(
+        id=row[0],
+        quest_name=row[1],
+        description=row[2],
+        week_start=row[3],
+        week_end=row[4],
+        org_id=row[5],
+        cohort_id=row[6],
+        requirements=QuestRequirements(**orjson.loads(row[7])),
+        rewards=QuestRewards(**orjson.loads(row[8])),
+        is_active=bool(row[9]),
+        created_at=row[10]
+    )
+
+
+def _active_quests_cache_key(org_id: Optional[int] = None, cohort_id: Optional[int] = None):
+    # Include the day so cached quests roll over along with the current week
+    return (org_id, cohort_id, date.today().isoformat())
+
+
+@async_ttl_cache(maxsize=256, ttl=60, key=_active_quests_cache_key)
 async def get_active_quests(org_id: Optional[int] = None, cohort_id: Optional[int] = None) -> List[WeeklyQuest]:
     """Get all active quests for current week"""
     today = date.today()
@@ -260,91 +431,123 @@ async def get_active_quests(org_id: Optional[int] = None, cohort_id: Optional[in
     
     results = await execute_db_operation(
         f"""
-        SELECT id, quest_name, description, week_start, week_end, org_id, cohort_id,
-               requirements, rewards, is_active, created_at
+        SELECT {_WEEKLY_QUEST_COLUMNS}
         FROM {weekly_quests_table_name}
         {where_clause}
         ORDER BY created_at DESC
         """,
         params,
-        fetch_all=True
+        fetch_all=True,
+        readonly=True
     )
     
-    quests = []
-    for row in results:
-        quests.append(WeeklyQuest(
-            id=row[0],
-            quest_name=row[1],
-            description=row[2],
-            week_start=row[3],
-            week_end=row[4],
-            org_id=row[5],
-            cohort_id=row[6],
-            requirements=QuestRequirements(**json.loads(row[7])),
-            rewards=QuestRewards(**json.loads(row[8])),
-            is_active=bool(row[9]),
-            created_at=row[10]
-        ))
-    
-    return quests
+    return [_weekly_quest_from_row(row) for row in results]
 
 
-async def get_user_quest_progress(user_id: int, quest_id: int) -> Optional[QuestCompletion]:
-    """Get user's progress on a specific quest"""
+async def get_quest_by_id(quest_id: int) -> Optional[WeeklyQuest]:
+    """Get a quest by ID if it is active for the current week"""
     result = await execute_db_operation(
         f"""
-        SELECT id, user_id, quest_id, progress, is_completed, completed_at,
-               points_earned, badges_earned, proof_data, created_at
-        FROM {quest_completions_table_name}
-        WHERE user_id = ? AND quest_id = ?
+        SELECT {_WEEKLY_QUEST_COLUMNS}
+        FROM {weekly_quests_table_name}
+        WHERE id = ? AND is_active = 1 AND ? BETWEEN week_start AND week_end
         """,
-        (user_id, quest_id),
-        fetch_one=True
+        (quest_id, date.today()),
+        fetch_one=True,
+        readonly=True
     )
     
     if not result:
         return None
     
+    return _weekly_quest_from_row(result)
+
+
+_QUEST_COMPLETION_COLUMNS = f"""
+    id, user_id, quest_id, {", ".join(_QUEST_PROGRESS_COLUMNS)}, is_completed,
+    completed_at, points_earned, badges_earned, proof_data, created_at
+"""
+
+
+def _quest_completion_from_row(row: Tuple) -> QuestCompletion:
+    progress_end = 3 + len(_QUEST_PROGRESS_COLUMNS)
+    progress = dict(zip(_QUEST_PROGRESS_COLUMNS, row[3:progress_end]))
+    is_completed, completed_at, points_earned, badges_earned, proof_data, created_at = row[progress_end:]
+    
     return QuestCompletion(
-        id=result[0],
-        user_id=result[1],
-        quest_id=result[2],
-        progress=QuestProgress(**json.loads(result[3])),
-        is_completed=bool(result[4]),
-        completed_at=result[5],
-        points_earned=result[6],
-        badges_earned=json.loads(result[7]) if result[7] else [],
-        proof_data=json.loads(result[8]) if result[8] else {},
-        created_at=result[9]
+        id=row[0],
+        user_id=row[1],
+        quest_id=row[2],
+        progress=QuestProgress(**progress),
+        is_completed=bool(is_completed),
+        completed_at=completed_at,
+        points_earned=points_earned,
+        badges_earned=orjson.loads(badges_earned) if badges_earned else [],
+        proof_data=orjson.loads(proof_data) if proof_data else {},
+        created_at=created_at
     )
 
 
+_SELECT_QUEST_PROGRESS = f"""
+    SELECT {_QUEST_COMPLETION_COLUMNS}
+    FROM {quest_completions_table_name}
+    WHERE user_id = ? AND quest_id = ?
+"""
+
+
+async def get_user_quest_progress(user_id: int, quest_id: int) -> Optional[QuestCompletion]:
+    """Get user's progress on a specific quest"""
+    async with db_pool.acquire(readonly=True) as conn:
+        async with conn.execute(_SELECT_QUEST_PROGRESS, (user_id, quest_id)) as cursor:
+            result = await cursor.fetchone()
+    
+    if not result:
+        return None
+    
+    return _quest_completion_from_row(result)
+
+
+async def get_quest_leaders(quest_id: int, limit: int = 10) -> List[QuestCompletion]:
+    """Get the users closest to completing a quest"""
+    results = await execute_db_operation(
+        f"""
+        SELECT {_QUEST_COMPLETION_COLUMNS}
+        FROM {quest_completions_table_name}
+        WHERE quest_id = ?
+        ORDER BY completion_percentage DESC
+        LIMIT ?
+        """,
+        (quest_id, limit),
+        fetch_all=True,
+        readonly=True
+    )
+    
+    return [_quest_completion_from_row(row) for row in results]
+
+
+# quest_completions is unique on (user_id, quest_id), so a single upsert
+# replaces the existence check followed by an INSERT or UPDATE
+_UPSERT_QUEST_PROGRESS_SQL = f"""
+    INSERT INTO {quest_completions_table_name}
+    (user_id, quest_id, progress, {", ".join(_QUEST_PROGRESS_COLUMNS)})
+    VALUES (?, ?, {_QUEST_PROGRESS_JSON}, {", ".join("?" * len(_QUEST_PROGRESS_COLUMNS))})
+    ON CONFLICT(user_id, quest_id) DO UPDATE SET
+        progress = excluded.progress,
+        {", ".join(f"{col} = excluded.{col}" for col in _QUEST_PROGRESS_COLUMNS)}
+"""
+
+
 async def update_quest_progress(user_id: int, quest_id: int, progress: QuestProgress) -> bool:
     """Update user's quest progress"""
     
-    # Check if progress record exists
-    existing = await get_user_quest_progress(user_id, quest_id)
+    progress_values = tuple(progress.dict().values())
     
-    if existing:
-        # Update existing record
-        await execute_db_operation(
-            f"""
-            UPDATE {quest_completions_table_name}
-            SET progress = ?, completion_percentage = ?
-            WHERE user_id = ? AND quest_id = ?
-            """,
-            (json.dumps(progress.dict()), progress.completion_percentage, user_id, quest_id)
-        )
-    else:
-        # Create new record
-        await execute_db_operation(
-            f"""
-            INSERT INTO {quest_completions_table_name}
-            (user_id, quest_id, progress)
-            VALUES (?, ?, ?)
-            """,
-            (user_id, quest_id, json.dumps(progress.dict()))
+    async with db_pool.acquire() as conn:
+        await conn.execute(
+            _UPSERT_QUEST_PROGRESS_SQL,
+            (user_id, quest_id, *progress_values, *progress_values)
         )
+        await conn.commit()
     
     return True
 
@@ -352,41 +555,40 @@ async def update_quest_progress(user_id: int, quest_id: int, progress: QuestProg
 async def calculate_quest_progress(user_id: int, quest: WeeklyQuest) -> QuestProgress:
     """Calculate user's current progress on a quest based on their activity"""
     
-    # Get user's activity for the quest week
-    week_start = datetime.combine(quest.week_start, datetime.min.time())
-    week_end = datetime.combine(quest.week_end, datetime.max.time())
+    # Quest week as a half-open range of UTC day numbers: [week_start, week_end + 1)
+    week_start_day = _day_start_epoch(quest.week_start) // 86400
+    week_end_day = _day_start_epoch(quest.week_end) // 86400 + 1
     
-    # Get session metrics for the week
+    # Sum the user's per-day session rollups (at most one row per day of the
+    # quest week) in SQL; the sums are then scored against the quest's
+    # already-parsed requirements, so every requirement a quest leaves out
+    # takes the same QuestRequirements default
     session_metrics = await execute_db_operation(
         f"""
         SELECT 
-            SUM(active_minutes) as total_active_minutes,
-            AVG(CASE 
-                WHEN session_quality = 'high' THEN 3.0
-                WHEN session_quality = 'medium' THEN 2.0
-                WHEN session_quality = 'low' THEN 1.0
-            END) as avg_quality_score,
-            COUNT(DISTINCT DATE(session_start)) as consistency_days,
-            COUNT(*) as total_sessions
-        FROM {learning_sessions_table_name}
-        WHERE user_id = ? AND session_start BETWEEN ? AND ?
+            COALESCE(SUM(active_minutes), 0) as total_active_minutes,
+            COALESCE(SUM(quality_sum) / NULLIF(SUM(quality_count), 0), 0) / 3.0 as avg_quality,
+            COUNT(day) as consistency_days
+        FROM {user_day_sessions_table_name}
+        WHERE user_id = ?
+            AND day >= ?
+            AND day < ?
+            AND sessions > 0
         """,
-        (user_id, week_start, week_end),
-        fetch_one=True
+        (user_id, week_start_day, week_end_day),
+        fetch_one=True,
+        readonly=True
     )
     
-    active_minutes = session_metrics[0] or 0
-    avg_quality = (session_metrics[1] or 0) / 3.0  # Normalize to 0-1
-    consistency_days = session_metrics[2] or 0
+    active_minutes, avg_quality, consistency_days = session_metrics
     
     # TODO: Calculate DP passes and peer reviews from other tables
     dp_passes = 0  # Placeholder
     peer_reviews = 0  # Placeholder
     
-    # Calculate completion percentage
     req = quest.requirements
     progress_scores = [
-        min(1.0, active_minutes / req.active_minutes),
+        min(1.0, active_minutes / req.active_minutes) if req.active_minutes > 0 else 1.0,
         min(1.0, dp_passes / req.dp_passes) if req.dp_passes > 0 else 1.0,
         min(1.0, peer_reviews / req.peer_reviews) if req.peer_reviews > 0 else 1.0,
         min(1.0, avg_quality / req.session_quality) if req.session_quality > 0 else 1.0,
@@ -409,6 +611,17 @@ async def calculate_quest_progress(user_id: int, quest: WeeklyQuest) -> QuestPro
 # Grace Token Operations
 # ================================
 
+_GRACE_TOKEN_COLUMNS = """id, user_id, token_type, granted_date, used_date, reason,
+           quest_id, session_id, is_used, expires_at"""
+
+_INSERT_GRACE_TOKEN_SQL = f"""
+    INSERT INTO {grace_tokens_table_name}
+    (user_id, token_type, reason, quest_id, session_id, granted_date, expires_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    RETURNING {_GRACE_TOKEN_COLUMNS}
+"""
+
+
 async def grant_grace_token(
     user_id: int,
     token_type: GraceTokenType,
@@ -416,93 +629,161 @@ async def grant_grace_token(
     quest_id: Optional[int] = None,
     session_id: Optional[int] = None,
     expires_days: int = 30
-) -> int:
-    """Grant a grace token to a user"""
+) -> GraceToken:
+    """Grant a grace token to a user and return the stored token"""
     
-    expires_at = datetime.now() + timedelta(days=expires_days)
+    # Grace token times are REAL unix seconds
+    now = time.time()
     
-    token_id = await execute_db_operation(
-        f"""
-        INSERT INTO {grace_tokens_table_name}
-        (user_id, token_type, reason, quest_id, session_id, expires_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (user_id, token_type.value, reason, quest_id, session_id, expires_at),
-        return_lastrowid=True
-    )
+    async with db_pool.acquire() as conn:
+        async with conn.execute(
+            _INSERT_GRACE_TOKEN_SQL,
+            (user_id, token_type.value, reason, quest_id, session_id, now, now + expires_days * 86400)
+        ) as cursor:
+            cursor.row_factory = aiosqlite.Row
+            row = await cursor.fetchone()
+        await conn.commit()
     
-    return token_id
+    return _grace_token_from_row(row)
+
+
+_SELECT_GRACE_TOKENS_BY_USER = f"""
+    SELECT {_GRACE_TOKEN_COLUMNS}
+    FROM {grace_tokens_table_name}
+    WHERE user_id = ?
+    ORDER BY granted_date DESC
+"""
+
+_SELECT_UNUSED_GRACE_TOKENS_BY_USER = f"""
+    SELECT {_GRACE_TOKEN_COLUMNS}
+    FROM {grace_tokens_table_name}
+    WHERE user_id = ? AND is_used = 0 AND (expires_at IS NULL OR expires_at > ?)
+    ORDER BY granted_date DESC
+"""
 
 
 async def get_user_grace_tokens(user_id: int, unused_only: bool = True) -> List[GraceToken]:
     """Get user's grace tokens"""
     
-    where_clause = "WHERE user_id = ?"
-    params = [user_id]
-    
     if unused_only:
-        where_clause += " AND is_used = 0 AND (expires_at IS NULL OR expires_at > ?)"
-        params.append(datetime.now())
+        query, params = _SELECT_UNUSED_GRACE_TOKENS_BY_USER, (user_id, time.time())
+    else:
+        query, params = _SELECT_GRACE_TOKENS_BY_USER, (user_id,)
     
-    results = await execute_db_operation(
-        f"""
-        SELECT id, user_id, token_type, granted_date, used_date, reason,
-               quest_id, session_id, is_used, expires_at
-        FROM {grace_tokens_table_name}
-        {where_clause}
-        ORDER BY granted_date DESC
-        """,
-        params,
-        fetch_all=True
-    )
+    async with db_pool.acquire(readonly=True) as conn:
+        async with conn.execute(query, params) as cursor:
+            cursor.row_factory = aiosqlite.Row
+            results = await cursor.fetchall()
     
-    return [
-        GraceToken(
-            id=row[0], user_id=row[1], token_type=GraceTokenType(row[2]),
-            granted_date=row[3], used_date=row[4], reason=row[5],
-            quest_id=row[6], session_id=row[7], is_used=bool(row[8]),
-            expires_at=row[9]
-        ) for row in results
-    ]
+    return [_grace_token_from_row(row) for row in results]
+
+
+_COUNT_UNUSED_GRACE_TOKENS_BY_USER = f"""
+    SELECT COUNT(*)
+    FROM {grace_tokens_table_name}
+    WHERE user_id = ? AND is_used = 0 AND (expires_at IS NULL OR expires_at > ?)
+"""
+
+
+async def count_unused_grace_tokens(user_id: int) -> int:
+    """Count a user's unused, unexpired grace tokens"""
+    async with db_pool.acquire(readonly=True) as conn:
+        async with conn.execute(_COUNT_UNUSED_GRACE_TOKENS_BY_USER, (user_id, time.time())) as cursor:
+            result = await cursor.fetchone()
+    
+    return result[0]
 
 
 async def use_grace_token(token_id: int, usage_reason: str) -> bool:
     """Use a grace token"""
     
-    # Check if token exists and is unused
-    token = await execute_db_operation(
-        f"""
-        SELECT id, is_used, expires_at
-        FROM {grace_tokens_table_name}
-        WHERE id = ?
-        """,
-        (token_id,),
-        fetch_one=True
-    )
-    
-    if not token or token[1]:  # Token doesn't exist or already used
-        return False
-    
-    if token[2] and datetime.fromisoformat(token[2]) < datetime.now():  # Token expired
-        return False
+    # Mark the token as used only if it is still unused and unexpired. Doing
+    # the check and the update in one statement means two concurrent requests
+    # can never both use the same token
+    now = time.time()
     
-    # Mark token as used
-    await execute_db_operation(
-        f"""
-        UPDATE {grace_tokens_table_name}
-        SET is_used = 1, used_date = ?
-        WHERE id = ?
-        """,
-        (datetime.now(), token_id)
-    )
+    async with db_pool.acquire() as conn:
+        cursor = await conn.execute(
+            f"""
+            UPDATE {grace_tokens_table_name}
+            SET is_used = 1, used_date = ?
+            WHERE id = ? AND is_used = 0
+                AND (expires_at IS NULL OR expires_at > ?)
+            RETURNING id
+            """,
+            (now, token_id, now)
+        )
+        # RETURNING rows must be read before the commit
+        used = await cursor.fetchone()
+        await conn.commit()
     
-    return True
+    return used is not None
 
 
 # ================================
 # Leaderboard Operations
 # ================================
 
+# Weekly and monthly boards are precomputed into these tables by
+# refresh_leaderboard_views; all-time boards read the running totals
+_LEADERBOARD_VIEWS = {
+    TimePeriod.WEEKLY: (weekly_leaderboard_view_table_name, 7),
+    TimePeriod.MONTHLY: (monthly_leaderboard_view_table_name, 30),
+}
+
+# The rollup is filtered and summed once per user before joining users, so
+# names are looked up for each ranked user rather than for every day bucket
+_REFRESH_LEADERBOARD_VIEW_SQL = f"""
+    WITH period_totals AS (
+        SELECT
+            user_id,
+            SUM(active_minutes) as total_active_minutes,
+            SUM(sessions) as total_sessions,
+            SUM(quality_sum) / NULLIF(SUM(quality_count), 0) as avg_quality_score
+        FROM {user_day_sessions_table_name}
+        WHERE day >= :cutoff_day
+        GROUP BY user_id
+        HAVING SUM(active_minutes) > 0
+    )
+    INSERT INTO {{table_name}}
+        (user_id, user_name, email, total_active_minutes, total_sessions, avg_quality_score, quests_completed)
+    SELECT
+        p.user_id,
+        COALESCE(u.first_name || ' ' || u.last_name, u.email),
+        u.email,
+        p.total_active_minutes,
+        p.total_sessions,
+        p.avg_quality_score,
+        (
+            SELECT COUNT(*) FROM {quest_completions_table_name} qc
+            WHERE qc.user_id = p.user_id AND qc.is_completed = 1 AND qc.completed_at >= :cutoff
+        )
+    FROM period_totals p
+    JOIN {users_table_name} u ON u.id = p.user_id
+"""
+
+
+async def refresh_leaderboard_views() -> None:
+    """Rebuild the weekly and monthly leaderboard tables from the per-day rollup"""
+    today = int(time.time()) // 86400
+    
+    async with db_pool.acquire() as conn:
+        # Both tables are swapped in one transaction so readers never see a
+        # half-built board
+        for table_name, days in _LEADERBOARD_VIEWS.values():
+            # The rollup is bucketed by whole UTC days, so a board covers the
+            # last `days` of them, today included, and quests completed since
+            # the first one started
+            cutoff_day = today - (days - 1)
+            cutoff = datetime.fromtimestamp(cutoff_day * 86400, timezone.utc).replace(tzinfo=None)
+            await conn.execute(f"DELETE FROM {table_name}")
+            await conn.execute(
+                _REFRESH_LEADERBOARD_VIEW_SQL.format(table_name=table_name),
+                {"cutoff": cutoff, "cutoff_day": cutoff_day}
+            )
+        await conn.commit()
+
+
 async def calculate_leaderboard(
     leaderboard_type: LeaderboardType,
     time_period: TimePeriod,
@@ -511,76 +792,78 @@ async def calculate_leaderboard(
 ) -> LeaderboardData:
     """Calculate leaderboard data for specified type and period"""
     
-    # Define time period
     now = datetime.now()
-    if time_period == TimePeriod.WEEKLY:
-        start_date = now - timedelta(days=7)
-    elif time_period == TimePeriod.MONTHLY:
-        start_date = now - timedelta(days=30)
-    else:  # ALL_TIME
-        start_date = datetime.min
     
     # Build query based on leaderboard type
     if leaderboard_type == LeaderboardType.COHORT:
         user_filter = f"""
-        AND u.id IN (
+        AND b.user_id IN (
             SELECT user_id FROM {user_cohorts_table_name} 
             WHERE cohort_id = ? AND role = 'learner'
         )
         """
-        params = [start_date, scope_id] if scope_id else [start_date]
+        filter_params = [scope_id]
     else:
         # For other types, we'll need to implement specific logic
         user_filter = ""
-        params = [start_date]
+        filter_params = []
+    
+    if time_period in _LEADERBOARD_VIEWS:
+        board_table_name, _ = _LEADERBOARD_VIEWS[time_period]
+        board = f"SELECT * FROM {board_table_name}"
+    else:  # ALL_TIME
+        board = f"""
+        SELECT
+            s.user_id,
+            COALESCE(u.first_name || ' ' || u.last_name, u.email) as user_name,
+            u.email,
+            s.active_minutes as total_active_minutes,
+            s.sessions as total_sessions,
+            s.quality_sum / NULLIF(s.quality_count, 0) as avg_quality_score,
+            s.quests_completed
+        FROM {user_leaderboard_scores_table_name} s
+        JOIN {users_table_name} u ON u.id = s.user_id
+        """
     
     # Calculate leaderboard entries
     results = await execute_db_operation(
         f"""
         SELECT 
-            u.id,
-            COALESCE(u.first_name || ' ' || u.last_name, u.email) as user_name,
-            u.email,
-            COALESCE(SUM(ls.active_minutes), 0) as total_active_minutes,
-            COUNT(DISTINCT ls.id) as total_sessions,
-            AVG(CASE 
-                WHEN ls.session_quality = 'high' THEN 3.0
-                WHEN ls.session_quality = 'medium' THEN 2.0
-                WHEN ls.session_quality = 'low' THEN 1.0
-                ELSE 2.0
-            END) as avg_quality_score,
-            COUNT(DISTINCT qc.id) as quests_completed
-        FROM {users_table_name} u
-        LEFT JOIN {learning_sessions_table_name} ls ON u.id = ls.user_id 
-            AND ls.session_start >= ?
-        LEFT JOIN {quest_completions_table_name} qc ON u.id = qc.user_id 
-            AND qc.is_completed = 1 AND qc.completed_at >= ?
-        WHERE 1=1 {user_filter}
-        GROUP BY u.id, u.first_name, u.last_name, u.email
-        HAVING total_active_minutes > 0
-        ORDER BY total_active_minutes DESC, avg_quality_score DESC
+            b.user_id,
+            b.user_name,
+            b.email,
+            b.total_active_minutes,
+            b.total_sessions,
+            COALESCE(b.avg_quality_score, 0.0) / 3.0 as session_quality_avg,
+            b.quests_completed
+        FROM ({board}) b
+        WHERE b.total_active_minutes > 0 {user_filter}
+        ORDER BY b.total_active_minutes DESC, b.avg_quality_score DESC
         LIMIT ?
         """,
-        params + [start_date, limit],
-        fetch_all=True
+        [*filter_params, limit],
+        fetch_all=True,
+        readonly=True
     )
     
     # TODO: Add streak calculation and badge logic
     
-    entries = []
-    for rank, row in enumerate(results, 1):
-        entries.append({
-            'user_id': row[0],
-            'user_name': row[1],
-            'user_email': row[2],
-            'score': row[3],  # Using active minutes as primary score
-            'rank': rank,
-            'active_minutes': row[3],
-            'quests_completed': row[6],
-            'streak_count': 0,  # TODO: Calculate from existing streak system
-            'session_quality_avg': row[5] / 3.0 if row[5] else 0.0,  # Normalize to 0-1
-            'badges': []  # TODO: Calculate badges
-        })
+    # Rows come straight from our own tables, so skip pydantic validation
+    entries = [
+        LeaderboardEntry.model_construct(
+            user_id=row[0],
+            user_name=row[1],
+            user_email=row[2],
+            score=row[3],  # Using active minutes as primary score
+            rank=rank,
+            active_minutes=row[3],
+            quests_completed=row[6],
+            streak_count=0,  # TODO: Calculate from existing streak system
+            session_quality_avg=row[5],  # Normalized to 0-1 in SQL
+            badges=[]  # TODO: Calculate badges
+        )
+        for rank, row in enumerate(results, 1)
+    ]
     
     return {
         'leaderboard_type': leaderboard_type,
@@ -593,28 +876,42 @@ async def calculate_leaderboard(
     }
 
 
+def _dump_model(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError
+
+
 async def cache_leaderboard(leaderboard_data: Dict, expires_hours: int = 1) -> int:
     """Cache leaderboard data for performance"""
     
-    expires_at = datetime.now() + timedelta(hours=expires_hours)
-    
-    cache_id = await execute_db_operation(
-        f"""
-        INSERT OR REPLACE INTO {leaderboard_cache_table_name}
-        (leaderboard_type, scope_id, time_period, leaderboard_data, expires_at)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (
-            leaderboard_data['leaderboard_type'],
-            leaderboard_data.get('scope_id'),
-            leaderboard_data['time_period'],
-            json.dumps(leaderboard_data),
-            expires_at
-        ),
-        return_lastrowid=True
+    params = (
+        leaderboard_data['leaderboard_type'],
+        leaderboard_data.get('scope_id'),
+        leaderboard_data['time_period'],
+        # Stored as the raw orjson bytes (a BLOB), skipping the text
+        # round-trip; orjson also handles the datetime and enum values,
+        # and the entry models are dumped through their fields
+        orjson.dumps(leaderboard_data, default=_dump_model),
+        f"+{expires_hours} hours"
     )
     
-    return cache_id
+    # The pooled writer serializes concurrent refreshes behind its lock
+    # instead of each opening its own connection and contending for the
+    # database lock. expires_at is computed by SQLite so it has the same UTC
+    # text format as CURRENT_TIMESTAMP, which the lookup compares it against
+    async with db_pool.acquire() as conn:
+        cursor = await conn.execute(
+            f"""
+            INSERT OR REPLACE INTO {leaderboard_cache_table_name}
+            (leaderboard_type, scope_id, time_period, leaderboard_data, expires_at)
+            VALUES (?, ?, ?, ?, datetime('now', ?))
+            """,
+            params
+        )
+        await conn.commit()
+    
+    return cursor.lastrowid
 
 
 async def get_cached_leaderboard(
@@ -624,18 +921,24 @@ async def get_cached_leaderboard(
 ) -> Optional[Dict]:
     """Get cached leaderboard if still valid"""
     
+    # UNIQUE treats NULL scopes as distinct, so an unscoped board can have
+    # several cached rows; the newest one wins
     result = await execute_db_operation(
         f"""
         SELECT leaderboard_data
         FROM {leaderboard_cache_table_name}
-        WHERE leaderboard_type = ? AND time_period = ? AND scope_id = ?
-            AND expires_at > ?
+        WHERE leaderboard_type = ? AND time_period = ? AND scope_id IS ?
+            AND expires_at > CURRENT_TIMESTAMP
+        ORDER BY id DESC
+        LIMIT 1
         """,
-        (leaderboard_type.value, time_period.value, scope_id, datetime.now()),
-        fetch_one=True
+        (leaderboard_type.value, time_period.value, scope_id),
+        fetch_one=True,
+        readonly=True
     )
     
     if result:
-        return json.loads(result[0])
+        # Accepts both the BLOB payloads and older TEXT ones
+        return orjson.loads(result[0])
     
     return None
@@ -29,6 +29,8 @@ from api.routes.ai import (
 )
 from api.websockets import router as websocket_router
 from api.scheduler import scheduler
+from api.db.gamification import refresh_leaderboard_views
+from api.utils.db import db_pool
 from api.settings import settings
 import bugsnag
 from bugsnag.asgi import BugsnagMiddleware
@@ -45,8 +47,12 @@ async def lifespan(app: FastAPI):
     asyncio.create_task(resume_pending_task_generation_jobs())
     asyncio.create_task(resume_pending_course_structure_generation_jobs())
 
+    # Build the scheduled leaderboard tables now rather than on the first interval
+    asyncio.create_task(refresh_leaderboard_views())
+
     yield
     scheduler.shutdown()
+    await db_pool.close()
 
 
 if settings.bugsnag_api_key:
@@ -3,6 +3,7 @@ API routes for the gamification system.
 Handles sessions, quests, leaderboards, and grace tokens.
 """
 
+import asyncio
 from fastapi import APIRouter, HTTPException, Query, Body
 from typing import List, Optional, Dict
 from datetime import datetime, date, timedelta
@@ -10,7 +11,7 @@ import traceback
 
 from api.models_gamification import (
     CreateSessionRequest, UpdateSessionRequest, SessionResponse,
-    CreateQuestRequest, QuestResponse, LeaderboardResponse,
+    CreateQuestRequest, QuestResponse, LeaderboardData, LeaderboardResponse,
     GrantTokenRequest, UseTokenRequest, TokenResponse,
     GamificationStatsResponse, UserGamificationProfile,
     LeaderboardType, TimePeriod, SessionQuality, GraceTokenType,
@@ -20,10 +21,12 @@ from api.models_gamification import (
 from api.db.gamification import (
     create_learning_session, update_learning_session, get_learning_session,
     get_user_active_sessions, get_user_session_metrics,
-    create_weekly_quest, get_active_quests, get_user_quest_progress,
+    create_weekly_quest, get_active_quests, get_quest_by_id, get_user_quest_progress,
     update_quest_progress, calculate_quest_progress,
-    grant_grace_token, get_user_grace_tokens, use_grace_token,
-    calculate_leaderboard, cache_leaderboard, get_cached_leaderboard
+    grant_grace_token, get_user_grace_tokens, count_unused_grace_tokens,
+    use_grace_token,
+    calculate_leaderboard, cache_leaderboard, get_cached_leaderboard,
+    refresh_leaderboard_views
 )
 
 router = APIRouter()
@@ -168,8 +171,7 @@ async def update_user_quest_progress(user_id: int, quest_id: int) -> Dict:
     """Update user's quest progress based on their recent activity"""
     try:
         # Get the quest details
-        active_quests = await get_active_quests()
-        quest = next((q for q in active_quests if q.id == quest_id), None)
+        quest = await get_quest_by_id(quest_id)
         
         if not quest:
             raise HTTPException(status_code=404, detail="Quest not found")
@@ -202,7 +204,7 @@ async def update_user_quest_progress(user_id: int, quest_id: int) -> Dict:
 async def grant_token(request: GrantTokenRequest) -> TokenResponse:
     """Grant a grace token to a user"""
     try:
-        token_id = await grant_grace_token(
+        token = await grant_grace_token(
             user_id=request.user_id,
             token_type=request.token_type,
             reason=request.reason,
@@ -211,12 +213,8 @@ async def grant_token(request: GrantTokenRequest) -> TokenResponse:
             expires_days=request.expires_days
         )
         
-        # Get the granted token details
-        tokens = await get_user_grace_tokens(request.user_id, unused_only=False)
-        token = next((t for t in tokens if t.id == token_id), None)
-        
-        # Count remaining tokens
-        remaining_tokens = len(await get_user_grace_tokens(request.user_id, unused_only=True))
+        # Count remaining tokens, including the one just granted
+        remaining_tokens = await count_unused_grace_tokens(request.user_id)
         
         return TokenResponse(
             token=token,
@@ -261,6 +259,21 @@ async def use_token(token_id: int, request: UseTokenRequest) -> Dict:
 # Leaderboard Endpoints
 # ================================
 
+# Fixed for the lifetime of the process, so built once at import
+_LEADERBOARD_TYPES = tuple(t.value for t in LeaderboardType)
+
+# Number of entries the admin refresh caches for each board
+_CACHED_LEADERBOARD_LIMIT = 100
+
+
+# Registered before /leaderboards/{leaderboard_type}, which would otherwise
+# capture "types" as a leaderboard type and reject it
+@router.get("/leaderboards/types", response_model=List[str])
+async def get_leaderboard_types() -> List[str]:
+    """Get available leaderboard types"""
+    return list(_LEADERBOARD_TYPES)
+
+
 @router.get("/leaderboards/{leaderboard_type}", response_model=LeaderboardResponse)
 async def get_leaderboard(
     leaderboard_type: LeaderboardType,
@@ -271,33 +284,40 @@ async def get_leaderboard(
 ) -> LeaderboardResponse:
     """Get leaderboard data for specified type and period"""
     try:
-        # Try to get cached leaderboard first
-        cached_data = await get_cached_leaderboard(leaderboard_type, time_period, scope_id)
+        # Boards cached by the admin refresh hold the top entries, so they
+        # serve any request for no more than that many
+        leaderboard_data = None
+        if limit <= _CACHED_LEADERBOARD_LIMIT:
+            leaderboard_data = await get_cached_leaderboard(
+                leaderboard_type, time_period, scope_id
+            )
         
-        if cached_data:
-            leaderboard_data = cached_data
+        if leaderboard_data:
+            entries = leaderboard_data['entries'][:limit]
+            leaderboard_data['entries'] = entries
+            leaderboard_data['total_participants'] = len(entries)
         else:
-            # Calculate fresh leaderboard
+            # Boards are kept ranked in indexed score tables, so on a cache
+            # miss the top entries are read from them directly
             leaderboard_data = await calculate_leaderboard(
                 leaderboard_type, time_period, scope_id, limit
             )
-            
-            # Cache the results
-            await cache_leaderboard(leaderboard_data, expires_hours=1)
         
-        # Find user's rank and entry if user_id provided
-        user_rank = None
-        user_entry = None
+        leaderboard = LeaderboardData.model_validate(leaderboard_data)
         
+        # Find user's rank and entry if user_id provided. The entries are
+        # built for this request, so a single pass that stops at the match
+        # is cheaper than indexing them all by user first
+        user_entry = None
         if user_id:
-            for entry in leaderboard_data['entries']:
-                if entry['user_id'] == user_id:
-                    user_rank = entry['rank']
-                    user_entry = entry
-                    break
+            user_entry = next(
+                (entry for entry in leaderboard.entries if entry.user_id == user_id),
+                None
+            )
+        user_rank = user_entry.rank if user_entry else None
         
         return LeaderboardResponse(
-            leaderboard=leaderboard_data,
+            leaderboard=leaderboard,
             user_rank=user_rank,
             user_entry=user_entry
         )
@@ -305,12 +325,6 @@ async def get_leaderboard(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/leaderboards/types", response_model=List[str])
-async def get_leaderboard_types() -> List[str]:
-    """Get available leaderboard types"""
-    return [t.value for t in LeaderboardType]
-
-
 # ================================
 # User Profile & Analytics
 # ================================
@@ -319,24 +333,29 @@ async def get_leaderboard_types() -> List[str]:
 async def get_user_gamification_profile(user_id: int) -> GamificationStatsResponse:
     """Get comprehensive gamification profile for a user"""
     try:
-        # Get session metrics
-        session_metrics = await get_user_session_metrics(user_id, days=30)
-        
-        # Get active quests
-        active_quests = await get_active_quests()
-        user_quests = []
-        
-        for quest in active_quests:
-            progress = await get_user_quest_progress(user_id, quest.id)
-            if progress:
-                user_quests.append(progress)
-        
-        # Get grace tokens
-        grace_tokens = await get_user_grace_tokens(user_id, unused_only=False)
-        available_tokens = await get_user_grace_tokens(user_id, unused_only=True)
-        
-        # Get recent sessions
-        recent_sessions = await get_user_active_sessions(user_id)
+        async def get_user_quests() -> List[QuestCompletion]:
+            # Get the user's progress on every active quest
+            active_quests = await get_active_quests()
+            progress_list = await asyncio.gather(
+                *[get_user_quest_progress(user_id, quest.id) for quest in active_quests]
+            )
+            return [progress for progress in progress_list if progress]
+        
+        # None of these depend on each other, so fetch them concurrently:
+        # session metrics, quest progress, grace tokens and recent sessions
+        (
+            session_metrics,
+            user_quests,
+            grace_tokens,
+            available_tokens,
+            recent_sessions,
+        ) = await asyncio.gather(
+            get_user_session_metrics(user_id, days=30),
+            get_user_quests(),
+            get_user_grace_tokens(user_id, unused_only=False),
+            get_user_grace_tokens(user_id, unused_only=True),
+            get_user_active_sessions(user_id),
+        )
         
         # TODO: Calculate badges, total points, and leaderboard rankings
         
@@ -393,17 +412,45 @@ async def refresh_all_leaderboards() -> Dict:
     """Refresh all cached leaderboards (admin endpoint)"""
     try:
         # This would be an admin-only endpoint in production
-        refresh_count = 0
         
-        for leaderboard_type in LeaderboardType:
-            for time_period in TimePeriod:
-                # Calculate and cache fresh leaderboard
-                leaderboard_data = await calculate_leaderboard(leaderboard_type, time_period)
-                await cache_leaderboard(leaderboard_data, expires_hours=2)
-                refresh_count += 1
+        # Rebuild the precomputed weekly/monthly boards before caching from them
+        await refresh_leaderboard_views()
+        
+        async def refresh_one(leaderboard_type: LeaderboardType, time_period: TimePeriod):
+            # Calculate and cache fresh leaderboard
+            leaderboard_data = await calculate_leaderboard(
+                leaderboard_type, time_period, limit=_CACHED_LEADERBOARD_LIMIT
+            )
+            await cache_leaderboard(leaderboard_data, expires_hours=2)
+        
+        boards = [
+            (leaderboard_type, time_period)
+            for leaderboard_type in LeaderboardType
+            for time_period in TimePeriod
+        ]
+        
+        # The boards are independent, so compute them concurrently. The
+        # connection pool bounds the reads to its reader connections, and
+        # its single writer runs the cache writes one at a time
+        results = await asyncio.gather(
+            *[refresh_one(*board) for board in boards],
+            return_exceptions=True
+        )
+        
+        # Every board runs to completion, so report each one that failed
+        failures = [
+            f"{leaderboard_type.value}/{time_period.value}: {result}"
+            for (leaderboard_type, time_period), result in zip(boards, results)
+            if isinstance(result, Exception)
+        ]
+        if failures:
+            raise Exception(
+                f"{len(failures)} of {len(boards)} leaderboards failed to refresh: "
+                + "; ".join(failures)
+            )
         
         return {
-            "refreshed_count": refresh_count,
+            "refreshed_count": len(results),
             "refreshed_at": datetime.now(),
             "message": "All leaderboards refreshed successfully"
         }
@@ -1,6 +1,8 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from api.db.task import publish_scheduled_tasks
 from api.cron import send_usage_summary_stats, save_daily_traces
+from api.db.gamification import refresh_leaderboard_views
+from api.config import leaderboard_refresh_interval_minutes
 from api.settings import settings
 from datetime import timezone, timedelta
 
@@ -28,3 +30,9 @@ async def daily_usage_stats():
 @scheduler.scheduled_job("cron", hour=10, minute=0, timezone=ist_timezone)
 async def daily_traces():
     save_daily_traces()
+
+
+# Rebuild the weekly and monthly leaderboard tables
+@scheduler.scheduled_job("interval", minutes=leaderboard_refresh_interval_minutes)
+async def refresh_leaderboards():
+    await refresh_leaderboard_views()
@@ -0,0 +1,72 @@
+import asyncio
+import copy
+from functools import wraps
+from typing import Callable, Optional
+from cachetools import TTLCache
+
+
+def async_ttl_cache(
+    maxsize: int = 256, ttl: float = 60, key: Optional[Callable] = None
+):
+    """
+    Cache the results of an async function in memory for `ttl` seconds.
+
+    `key` builds the cache key from the call arguments; by default the
+    positional and keyword arguments themselves are used. Every caller gets
+    its own deep copy of the cached result, so changing it can't affect
+    other callers. The wrapped function gets a `cache_clear()` to drop every
+    cached entry, e.g. after a write that changes what it would return.
+    """
+
+    def decorator(func):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # the running call for each key that missed the cache
+        in_flight = {}
+
+        def make_key(*args, **kwargs):
+            if key is not None:
+                return key(*args, **kwargs)
+
+            return args + tuple(sorted(kwargs.items()))
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache_key = make_key(*args, **kwargs)
+
+            try:
+                return copy.deepcopy(cache[cache_key])
+            except KeyError:
+                pass
+
+            # concurrent misses for a key wait for the first caller's call
+            # instead of all running the underlying query, while misses for
+            # other keys go ahead
+            future = in_flight.get(cache_key)
+            if future is None:
+                future = asyncio.ensure_future(func(*args, **kwargs))
+                in_flight[cache_key] = future
+
+                def store(done, cache_key=cache_key):
+                    # a call still running when cache_clear() was called may
+                    # have read the old data, so its result isn't kept
+                    if in_flight.get(cache_key) is not done:
+                        return
+
+                    del in_flight[cache_key]
+                    if not done.cancelled() and done.exception() is None:
+                        cache[cache_key] = done.result()
+
+                future.add_done_callback(store)
+
+            # shielded so that a caller giving up doesn't cancel the call for
+            # everyone else waiting on it
+            return copy.deepcopy(await asyncio.shield(future))
+
+        def cache_clear():
+            cache.clear()
+            in_flight.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
@@ -1,22 +1,36 @@
 import sqlite3
-from typing import List, Tuple
+from typing import List, Set, Tuple
 from api.config import sqlite_db_path
 from api.utils.logging import logger
+from api.utils.db_pool import ConnectionPool
 import aiosqlite
 from contextlib import asynccontextmanager
 
 
+# Applied to every new connection. journal_mode=WAL is persisted in the
+# database file itself by set_db_defaults, so it is not repeated here.
+connection_pragmas = """
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+PRAGMA mmap_size=268435456;
+"""
+
+
 def trace_callback(sql):
     # Record the start time and SQL
     logger.info(f"Executing operation: {sql}")
 
 
+db_pool = ConnectionPool(sqlite_db_path, connection_pragmas, trace_callback)
+
+
 @asynccontextmanager
 async def get_new_db_connection():
     conn = None
     try:
         conn = await aiosqlite.connect(sqlite_db_path)
-        await conn.execute("PRAGMA synchronous=NORMAL;")
+        await conn.executescript(connection_pragmas)
         await conn.set_trace_callback(trace_callback)
         yield conn
     except Exception as e:
@@ -48,8 +62,13 @@ async def execute_db_operation(
     fetch_one=False,
     fetch_all=False,
     get_last_row_id=False,
+    readonly=False,
 ):
-    async with get_new_db_connection() as conn:
+    # reads are served from the pooled query-only connections; writes get a
+    # fresh connection with their own transaction
+    connection = db_pool.acquire(readonly=True) if readonly else get_new_db_connection()
+
+    async with connection as conn:
         cursor = await conn.cursor()
 
         if params:
@@ -64,7 +83,8 @@ async def execute_db_operation(
         else:
             result = None
 
-        await conn.commit()
+        if not readonly:
+            await conn.commit()
 
         if get_last_row_id:
             return cursor.lastrowid
@@ -104,6 +124,16 @@ async def check_table_exists(table_name: str, cursor):
     return table_exists is not None
 
 
+async def get_existing_tables(table_names: List[str], cursor) -> Set[str]:
+    placeholders = ",".join("?" * len(table_names))
+    await cursor.execute(
+        f"SELECT name FROM sqlite_master WHERE type='table' AND name IN ({placeholders})",
+        table_names,
+    )
+
+    return {row[0] for row in await cursor.fetchall()}
+
+
 def serialise_list_to_str(list_to_serialise: List[str]):
     if list_to_serialise:
         return ",".join(list_to_serialise)
@@ -0,0 +1,113 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional
+import aiosqlite
+
+
+class ConnectionPool:
+    """
+    Long-lived SQLite connections: one writer and up to `max_readers`
+    query-only readers. Reusing connections keeps SQLite's per-connection
+    page cache warm and avoids reopening the WAL/SHM files on every query.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        pragmas: str,
+        trace_callback: Optional[Callable[[str], None]] = None,
+        max_readers: Optional[int] = None,
+    ):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self.trace_callback = trace_callback
+        self.max_readers = max_readers or min(8, os.cpu_count() or 1)
+
+        self._loop = None
+        self._writer = None
+        self._writer_lock = None
+        self._idle_readers = None
+        self._reader_count = 0
+        self._connections: List[aiosqlite.Connection] = []
+
+    async def _bind_to_running_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        # Locks, queues and pending futures belong to the loop they were
+        # created on, so start afresh if we are now running on another one
+        await self.close()
+        self._loop = loop
+        self._writer_lock = asyncio.Lock()
+        self._idle_readers = asyncio.Queue()
+
+    async def _connect(self, readonly: bool) -> aiosqlite.Connection:
+        conn = aiosqlite.connect(self.db_path)
+        # don't keep the interpreter alive if the pool is never closed
+        conn.daemon = True
+        await conn
+
+        try:
+            await conn.executescript(self.pragmas)
+            if readonly:
+                await conn.execute("PRAGMA query_only=1;")
+            if self.trace_callback:
+                await conn.set_trace_callback(self.trace_callback)
+        except Exception:
+            await conn.close()
+            raise
+
+        self._connections.append(conn)
+        return conn
+
+    async def _get_reader(self) -> aiosqlite.Connection:
+        if not self._idle_readers.empty():
+            return self._idle_readers.get_nowait()
+
+        if self._reader_count < self.max_readers:
+            # The slot is claimed before connecting so that concurrent callers
+            # can't open more than max_readers, and handed back if that fails
+            self._reader_count += 1
+            try:
+                return await self._connect(readonly=True)
+            except Exception:
+                self._reader_count -= 1
+                raise
+
+        return await self._idle_readers.get()
+
+    @asynccontextmanager
+    async def acquire(self, readonly: bool = False):
+        await self._bind_to_running_loop()
+
+        if readonly:
+            conn = await self._get_reader()
+            try:
+                yield conn
+            finally:
+                self._idle_readers.put_nowait(conn)
+            return
+
+        async with self._writer_lock:
+            if self._writer is None:
+                self._writer = await self._connect(readonly=False)
+
+            try:
+                yield self._writer
+            finally:
+                # Whatever the block left uncommitted, including when it was
+                # cancelled mid-write, is discarded rather than handed to the
+                # next borrower to commit
+                if self._writer is not None and self._writer.in_transaction:
+                    await self._writer.rollback()
+
+    async def close(self):
+        connections, self._connections = self._connections, []
+        self._writer = None
+        self._reader_count = 0
+        self._loop = None
+
+        for conn in connections:
+            await conn.close()
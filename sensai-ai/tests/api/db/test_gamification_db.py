@@ -0,0 +1,649 @@
+import orjson
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch, AsyncMock, MagicMock
+from src.api.models_gamification import (
+    SessionQuality,
+    GraceTokenType,
+    LeaderboardEntry,
+    LeaderboardType,
+    TimePeriod,
+    QuestProgress,
+    QuestRequirements,
+    QuestRewards,
+    WeeklyQuest,
+)
+from src.api.db import gamification
+from src.api.db.gamification import (
+    table_available,
+    update_quest_progress,
+    get_quest_leaders,
+    get_active_quests,
+    get_quest_by_id,
+    create_weekly_quest,
+    use_grace_token,
+    grant_grace_token,
+    count_unused_grace_tokens,
+    calculate_quest_progress,
+    calculate_leaderboard,
+    refresh_leaderboard_views,
+    cache_leaderboard,
+    get_cached_leaderboard,
+    create_learning_session,
+    create_learning_sessions_bulk,
+    get_session_metrics_bulk,
+    update_learning_session,
+    get_learning_session,
+    get_user_grace_tokens,
+    _UPDATE_SESSION_SQL,
+    _SELECT_SESSION_BY_ID,
+    _SELECT_UNUSED_GRACE_TOKENS_BY_USER,
+    _INSERT_GRACE_TOKEN_SQL,
+    _COUNT_UNUSED_GRACE_TOKENS_BY_USER,
+)
+
+
+def mock_reader(mock_pool, fetchone=None, fetchall=None):
+    """Wire a pooled reader connection whose execute yields a cursor."""
+    mock_cursor = AsyncMock()
+    mock_cursor.fetchone.return_value = fetchone
+    mock_cursor.fetchall.return_value = fetchall
+    mock_cursor.__aenter__.return_value = mock_cursor
+    mock_conn = AsyncMock()
+    mock_conn.__aenter__.return_value = mock_conn
+    mock_conn.execute = MagicMock(return_value=mock_cursor)
+    mock_pool.acquire.return_value = mock_conn
+    return mock_conn
+
+
+def mock_writer(mock_pool, fetchone=None, lastrowid=None):
+    """Wire the pooled writer connection whose awaited execute yields a cursor."""
+    mock_cursor = AsyncMock()
+    mock_cursor.fetchone.return_value = fetchone
+    mock_cursor.lastrowid = lastrowid
+    mock_conn = AsyncMock()
+    mock_conn.__aenter__.return_value = mock_conn
+    mock_conn.execute.return_value = mock_cursor
+    mock_conn.cursor.return_value = mock_cursor
+    mock_pool.acquire.return_value = mock_conn
+    return mock_conn
+
+
+@pytest.mark.asyncio
+class TestLearningSessionOperations:
+    """Test learning session database operations."""
+
+    @patch("src.api.db.gamification.db_pool")
+    async def test_create_learning_session(self, mock_pool):
+        """Test a session is inserted through the pooled writer."""
+        mock_conn = mock_writer(mock_pool, lastrowid=7)
+
+        assert await create_learning_session(1, task_id=10) == 7
+
+        mock_pool.acquire.assert_called_once_with()
+        query, params = mock_conn.execute.call_args[0]
+        assert "INSERT INTO learning_sessions" in query
+        assert params == (1, 10, None)
+        mock_conn.commit.assert_called_once()
+
+    @patch("src.api.db.gamification.db_pool")
+    async def test_create_learning_sessions_bulk(self, mock_pool):
+        """Test bulk session creation uses a single executemany."""
+        mock_conn = mock_writer(mock_pool, fetchone=(12,))
+        mock_cursor = mock_conn.cursor.return_value
+
+        result = await create_learning_sessions_bulk(
+            [(1, 10, None), (2, None, 20), (3, None, None)]
+        )
+
+        assert result == [10, 11, 12]
+        mock_cursor.executemany.assert_called_once()
+        rows = mock_cursor.executemany.call_args[0][1]
+        assert rows == [
+            (1, 10, None),
+            (2, None, 20),
+            (3, None, None),
+        ]
+        mock_conn.commit.assert_called_once()
+
+    @patch("src.api.db.gamification.db_pool")
+    async def test_create_learning_sessions_bulk_empty(self, mock_pool):
+        """Test bulk session creation with no sessions is a no-op."""
+        result = await create_learning_sessions_bulk([])
+
+        assert result == []
+        mock_pool.acquire.assert_not_called()
+
+    @patch("src.api.db.gamification.db_pool")
+    async def test_update_learning_session(self, mock_pool):
+        """Test session update binds every field to the fixed statement."""
+        mock_conn = AsyncMock()
+        mock_conn.__aenter__.return_value = mock_conn
+        mock_pool.acquire.return_value = mock_conn
+
+        result = await update_learning_session(
+            5,
+            active_minutes=30,
+            session_quality=SessionQuality.HIGH,
+            is_completed=True,
+        )
+
+        assert result is True
+        mock_conn.execute.assert_called_once_with(
+            _UPDATE_SESSION_SQL, (None, None, 30, None, None, "high", 1, 5)
+        )
+        mock_conn.commit.assert_called_once()
+
+    @patch("src.api.db.gamification.db_pool")
+    async def test_update_learning_session_no_fields(self, mock_pool):
+        """Test session update without any fields does nothing."""
+        result = await update_learning_session(5)
+
+        assert result is False
+        mock_pool.acquire.assert_not_called()
+
+    @patch("src.api.db.gamification.db_pool")
+    async def test_get_learning_session(self, mock_pool):
+        """Test a session is read through a pooled reader connection."""
+        mock_conn = mock_reader(
+            mock_pool,
+            fetchone={
+                "id": 5,
+                "user_id": 1,
+                "task_id": 10,
+                "question_id": None,
+                "session_start": 1700000000,
+                "session_end": "2023-11-15 04:43:20+05:30",
+                "total_minutes": 0,
+                "active_minutes": 30,
+                "interactions_count": 4,
+                "learning_velocity": 0.5,
+                "session_quality": "high",
+                "is_completed": 0,
+                "created_at": "2023-11-14 22:13:20",
+            },
+        )
+
+        result = await get_learning_session(5)
+
+        assert result.id == 5
+        assert result.session_quality == SessionQuality.HIGH
+        assert result.is_completed is False
+        # every time comes back as aware UTC, so they can be compared
+        for value in (result.session_start, result.session_end, result.created_at):
+            assert value.tzinfo == timezone.utc
+        assert result.session_start == datetime(
+            2023, 11, 14, 22, 13, 20, tzinfo=timezone.utc
+        )
+        assert result.created_at == result.session_start
+        assert result.session_end - result.session_start == timedelta(hours=1)
+        mock_pool.acquire.assert_called_once_with(readonly=True)
+        mock_conn.execute.assert_called_once_with(_SELECT_SESSION_BY_ID, (5,))
+
+    @patch("src.api.db.gamification.db_pool")
+    async def test_get_learning_session_not_found(self, mock_pool):
+        """Test a missing session returns None."""
+        mock_reader(mock_pool, fetchone=None)
+
+        assert await get_learning_session(5) is None
+
+    @patch("src.api.db.gamification.execute_db_operation")
+    async def test_get_session_metrics_bulk(self, mock_execute):
+        """Test metrics for many users come from one grouped query."""
+        mock_execute.return_value = [(1, 4, 120, 1.5, 2.5, 3)]
+
+        result = await get_session_metrics_bulk([1, 2], days=14)
+
+        assert result == {
+            1: {
+                "total_sessions": 4,
+                "total_active_minutes": 120,
+                "avg_velocity": 1.5,
+                "avg_quality_score": 2.5,
+                "completed_sessions": 3,
+            },
+            2: {
+                "total_sessions": 0,
+                "total_active_minutes": 0,
+                "avg_velocity": 0.0,
+                "avg_quality_score": 0.0,
+                "completed_sessions": 0,
+            },
+        }
+        mock_execute.assert_called_once()
+        query, params = mock_execute.call_args[0]
+        assert "user_id IN (?,?)" in query
+        assert "GROUP BY user_id" in query
+        assert params == (1, 2, 14)
+
+    @patch("src.api.db.gamification.execute_db_operation")
+    async def test_get_session_metrics_bulk_empty(self, mock_execute):
+        """Test bulk metrics with no users skips the query."""
+        assert await get_session_metrics_bulk([]) == {}
+        mock_execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+class TestQuestOperations:
+    """Test weekly quest database operations."""
+
+    @patch("src.api.db.gamification.db_pool")
+    async def test_update_quest_progress_upserts(self, mock_pool):
+        """Test quest progress is written with a single upsert."""
+        mock_conn = mock_writer(mock_pool)
+        progress = QuestProgress(active_minutes=45, completion_percentage=0.5)
+
+        result = await update_quest_progress(1, 2, progress)
+
+        assert result is True
+        mock_conn.execute.assert_called_once()
+        mock_conn.commit.assert_called_once()
+        query, params = mock_conn.execute.call_args[0]
+        assert "ON CONFLICT(user_id, quest_id) DO UPDATE" in query
+        assert "json_object('active_minutes', ?" in query
+        assert "completion_percentage = excluded.completion_percentage" in query
+        # progress values are bound once for the JSON copy, once for the columns
+        assert params == (1, 2) + (45, 0, 0, 0.0, 0, 0.5) * 2
+
+    @patch("src.api.db.gamification.execute_db_operation")
+    async def test_get_quest_leaders(self, mock_execute):
+        """Test quest leaders are read from the progress columns."""
+        mock_execute.return_value = [
+            (
+                1,
+                5,
+                2,
+                90,
+                3,
+                1,
+                0.9,
+                5,
+                1.0,
+                1,
+                None,
+                500,
+                '["Active Learner"]',
+                None,
+                None,
+            ),
+        ]
+
+        result = await get_quest_leaders(2, limit=5)
+
+        assert len(result) == 1
+        assert result[0].user_id == 5
+        assert result[0].progress.model_dump() == {
+            "active_minutes": 90,
+            "dp_passes": 3,
+            "peer_reviews": 1,
+            "avg_session_quality": 0.9,
+            "consistency_days": 5,
+            "completion_percentage": 1.0,
+        }
+        assert result[0].is_completed is True
+        assert result[0].badges_earned == ["Active Learner"]
+        assert result[0].proof_data == {}
+        query, params = mock_execute.call_args[0]
+        assert "ORDER BY completion_percentage DESC" in query
+        assert params == (2, 5)
+
+    @patch("src.api.db.gamification.db_pool")
+    @patch("src.api.db.gamification.execute_db_operation")
+    async def test_get_active_quests_is_cached(self, mock_execute, mock_pool):
+        """Test active quests are served from cache until a quest is created."""
+        mock_conn = mock_writer(mock_pool, lastrowid=9)
+        mock_execute.return_value = []
+        get_active_quests.cache_clear()
+
+        await get_active_quests(org_id=1)
+        await get_active_quests(1)
+        assert mock_execute.call_count == 1
+
+        quest_id = await create_weekly_quest(
+            "Quest",
+            "Description",
+            date(2024, 1, 1),
+            date(2024, 1, 7),
+            QuestRequirements(),
+            QuestRewards(),
+        )
+        assert quest_id == 9
+        mock_conn.commit.assert_called_once()
+
+        await get_active_quests(org_id=1)
+        assert mock_execute.call_count == 2
+
+    @patch("src.api.db.gamification.execute_db_operation")
+    async def test_get_quest_by_id(self, mock_execute):
+        """Test a single current quest is looked up by its id."""
+        mock_execute.return_value = (
+            7,
+            "Quest",
+            "Description",
+            "2024-01-01",
+            "2024-01-07",
+            None,
+            None,
+            "{}",
+            "{}",
+            1,
+            None,
+        )
+
+        result = await get_quest_by_id(7)
+
+        assert result.id == 7
+        assert result.requirements.model_dump() == QuestRequirements().model_dump()
+        query, params = mock_execute.call_args[0]
+        assert "WHERE id = ? AND is_active = 1" in query
+        assert params == (7, date.today())
+
+    @patch("src.api.db.gamification.execute_db_operation")
+    async def test_get_quest_by_id_not_found(self, mock_execute):
+        """Test a missing or inactive quest returns None."""
+        mock_execute.return_value = None
+
+        assert await get_quest_by_id(7) is None
+
+    @patch("src.api.db.gamification.execute_db_operation")
+    async def test_calculate_quest_progress(self, mock_execute):
+        """Test the summed day rollups are scored against the quest requirements."""
+        mock_execute.return_value = (60, 0.9, 2)
+        quest = WeeklyQuest(
+            id=7,
+            quest_name="Quest",
+            description="Description",
+            week_start=date(2024, 1, 1),
+            week_end=date(2024, 1, 7),
+            requirements=QuestRequirements(),
+            rewards=QuestRewards(),
+        )
+
+        result = await calculate_quest_progress(3, quest)
+
+        assert result.active_minutes == 60
+        assert result.avg_session_quality == 0.9
+        assert result.consistency_days == 2
+        # 60 of 120 minutes, 0.9 against a 0.8 quality bar and 2 of 5 days;
+        # dp_passes and peer_reviews are still placeholders scoring 0
+        assert result.completion_percentage == pytest.approx((0.5 + 1.0 + 0.4) / 5)
+        # UTC day numbers of 2024-01-01 up to (excluding) 2024-01-08
+        assert mock_execute.call_args[0][1] == (3, 19723, 19730)
+
+    @patch("src.api.db.gamification.execute_db_operation")
+    async def test_calculate_quest_progress_defaults_missing_requirements(
+        self, mock_execute
+    ):
+        """Test a requirement left out of the stored JSON is scored at its model default."""
+        mock_execute.return_value = (60, 0.9, 1)
+        quest = WeeklyQuest(
+            id=7,
+            quest_name="Quest",
+            description="Description",
+            week_start=date(2024, 1, 1),
+            week_end=date(2024, 1, 7),
+            # no consistency_days, so the default of 5 days applies
+            requirements=QuestRequirements(
+                **orjson.loads(
+                    '{"active_minutes": 60, "dp_passes": 0, "peer_reviews": 0, "session_quality": 0}'
+                )
+            ),
+            rewards=QuestRewards(),
+        )
+
+        result = await calculate_quest_progress(3, quest)
+
+        # full credit for everything but consistency: 1 of 5 days
+        assert result.completion_percentage == pytest.approx((4 + 0.2) / 5)
+
+
+@pytest.mark.asyncio
+class TestGraceTokenOperations:
+    """Test grace token database operations."""
+
+    @patch("src.api.db.gamification.time.time")
+    @patch("src.api.db.gamification.db_pool")
+    async def test_grant_grace_token(self, mock_pool, mock_time):
+        """Test the granted token is returned from the insert itself."""
+        mock_time.return_value = 1000.0
+        mock_conn = mock_reader(
+            mock_pool,
+            fetchone={
+                "id": 3,
+                "user_id": 1,
+                "token_type": "streak_save",
+                "granted_date": 1000.0,
+                "used_date": None,
+                "reason": "reason",
+                "quest_id": None,
+                "session_id": None,
+                "is_used": 0,
+                "expires_at": 1000.0 + 2 * 86400,
+            },
+        )
+
+        result = await grant_grace_token(
+            1, GraceTokenType.STREAK_SAVE, "reason", expires_days=2
+        )
+
+        assert result.id == 3
+        assert result.is_used is False
+        mock_pool.acquire.assert_called_once_with()
+        query, params = mock_conn.execute.call_args[0]
+        assert query == _INSERT_GRACE_TOKEN_SQL
+        assert "RETURNING" in query
+        # grant and expiry times are bound as unix seconds
+        assert params[-2:] == (1000.0, 1000.0 + 2 * 86400)
+        mock_conn.commit.assert_called_once()
+
+    @patch("src.api.db.gamification.time.time")
+    @patch("src.api.db.gamification.db_pool")
+    async def test_count_unused_grace_tokens(self, mock_pool, mock_time):
+        """Test unused tokens are counted in SQL against the current time."""
+        mock_time.return_value = 1000.0
+        mock_conn = mock_reader(mock_pool, fetchone=(2,))
+
+        assert await count_unused_grace_tokens(1) == 2
+
+        mock_pool.acquire.assert_called_once_with(readonly=True)
+        mock_conn.execute.assert_called_once_with(
+            _COUNT_UNUSED_GRACE_TOKENS_BY_USER, (1, 1000.0)
+        )
+
+    @patch("src.api.db.gamification.time.time")
+    @patch("src.api.db.gamification.db_pool")
+    async def test_get_user_grace_tokens_unused(self, mock_pool, mock_time):
+        """Test unused tokens are filtered on expiry against the current time."""
+        mock_time.return_value = 1000.0
+        mock_conn = mock_reader(
+            mock_pool,
+            fetchall=[
+                {
+                    "id": 1,
+                    "user_id": 2,
+                    "token_type": "streak_save",
+                    "granted_date": 900.0,
+                    "used_date": None,
+                    "reason": "reason",
+                    "quest_id": None,
+                    "session_id": None,
+                    "is_used": 0,
+                    "expires_at": 2000.0,
+                }
+            ],
+        )
+
+        result = await get_user_grace_tokens(2)
+
+        assert len(result) == 1
+        assert result[0].token_type == GraceTokenType.STREAK_SAVE
+        assert result[0].is_used is False
+        assert result[0].expires_at == datetime.fromtimestamp(2000.0, timezone.utc)
+        mock_conn.execute.assert_called_once_with(
+            _SELECT_UNUSED_GRACE_TOKENS_BY_USER, (2, 1000.0)
+        )
+
+    @patch("src.api.db.gamification.db_pool")
+    async def test_use_grace_token(self, mock_pool):
+        """Test a usable token is claimed with one conditional update."""
+        mock_conn = mock_writer(mock_pool, fetchone=(4,))
+
+        assert await use_grace_token(4, "reason") is True
+
+        mock_conn.execute.assert_called_once()
+        mock_conn.commit.assert_called_once()
+        query, params = mock_conn.execute.call_args[0]
+        assert "is_used = 0" in query
+        assert "RETURNING id" in query
+        now, token_id, expiry_cutoff = params
+        assert token_id == 4
+        assert isinstance(now, float) and expiry_cutoff == now
+
+    @patch("src.api.db.gamification.db_pool")
+    async def test_use_grace_token_unavailable(self, mock_pool):
+        """Test a used, expired or missing token is not claimed."""
+        mock_conn = mock_writer(mock_pool, fetchone=None)
+
+        assert await use_grace_token(4, "reason") is False
+        mock_conn.execute.assert_called_once()
+
+
+@pytest.mark.asyncio
+class TestLeaderboardOperations:
+    """Test leaderboard database operations."""
+
+    @patch("src.api.db.gamification.execute_db_operation")
+    async def test_calculate_leaderboard_all_time(self, mock_execute):
+        """Test all-time leaderboards read the trigger-maintained totals."""
+        mock_execute.return_value = [(1, "Ada L", "ada@example.com", 90, 3, 0.8, 1)]
+
+        result = await calculate_leaderboard(
+            LeaderboardType.COHORT, TimePeriod.ALL_TIME, scope_id=4, limit=10
+        )
+
+        entry = result["entries"][0]
+        assert entry.rank == 1
+        assert entry.active_minutes == 90
+        assert entry.quests_completed == 1
+        assert entry.session_quality_avg == 0.8
+        query, params = mock_execute.call_args[0]
+        assert "COALESCE(b.avg_quality_score, 0.0) / 3.0" in query
+        assert "FROM user_leaderboard_scores" in query
+        assert "learning_sessions" not in query
+        assert params == [4, 10]
+
+    @patch("src.api.db.gamification.execute_db_operation")
+    async def test_calculate_leaderboard_weekly(self, mock_execute):
+        """Test windowed leaderboards read the precomputed weekly table."""
+        mock_execute.return_value = []
+
+        result = await calculate_leaderboard(LeaderboardType.GLOBAL, TimePeriod.WEEKLY)
+
+        assert result["entries"] == []
+        query, params = mock_execute.call_args[0]
+        assert "FROM mv_leaderboard_weekly" in query
+        assert "user_day_sessions" not in query
+        assert params == [100]
+
+    @patch("src.api.db.gamification.time.time")
+    @patch("src.api.db.gamification.db_pool")
+    async def test_refresh_leaderboard_views(self, mock_pool, mock_time):
+        """Test both boards are rebuilt from the day buckets in one transaction."""
+        # 2024-03-10 15:00 UTC, in UTC day 19792
+        mock_time.return_value = 1710082800.0
+        mock_conn = AsyncMock()
+        mock_conn.__aenter__.return_value = mock_conn
+        mock_pool.acquire.return_value = mock_conn
+
+        await refresh_leaderboard_views()
+
+        statements = [call[0] for call in mock_conn.execute.call_args_list]
+        assert [statement[0] for statement in statements[::2]] == [
+            "DELETE FROM mv_leaderboard_weekly",
+            "DELETE FROM mv_leaderboard_monthly",
+        ]
+        weekly_insert, monthly_insert = statements[1], statements[3]
+        assert "INSERT INTO mv_leaderboard_weekly" in weekly_insert[0]
+        assert "INSERT INTO mv_leaderboard_monthly" in monthly_insert[0]
+        # Each board spans exactly 7 or 30 UTC days ending today: from the
+        # start of 2024-03-04 and 2024-02-10 respectively
+        assert weekly_insert[1] == {
+            "cutoff": datetime(2024, 3, 4),
+            "cutoff_day": 19786,
+        }
+        assert monthly_insert[1] == {
+            "cutoff": datetime(2024, 2, 10),
+            "cutoff_day": 19763,
+        }
+        mock_conn.commit.assert_called_once()
+
+    @patch("src.api.db.gamification.execute_db_operation")
+    @patch("src.api.db.gamification.db_pool")
+    async def test_cache_leaderboard_round_trip(self, mock_pool, mock_execute):
+        """Test leaderboards are cached through the pooled writer as orjson bytes and decoded back."""
+        mock_conn = mock_writer(mock_pool, lastrowid=1)
+        leaderboard = {
+            "leaderboard_type": LeaderboardType.GLOBAL,
+            "scope_id": None,
+            "time_period": TimePeriod.WEEKLY,
+            "entries": [LeaderboardEntry.model_construct(user_id=1, rank=1, badges=[])],
+            "last_updated": datetime(2024, 1, 1),
+        }
+
+        assert await cache_leaderboard(leaderboard) == 1
+
+        mock_pool.acquire.assert_called_once_with()
+        mock_conn.commit.assert_called_once()
+        payload, expiry_offset = mock_conn.execute.call_args[0][1][3:]
+        assert isinstance(payload, bytes)
+        assert expiry_offset == "+1 hours"
+
+        mock_execute.return_value = (payload,)
+        result = await get_cached_leaderboard(LeaderboardType.GLOBAL, TimePeriod.WEEKLY)
+
+        query, params = mock_execute.call_args[0]
+        assert "scope_id IS ?" in query
+        assert "expires_at > CURRENT_TIMESTAMP" in query
+        assert params == ("global", "weekly", None)
+
+        assert result["entries"] == [{"user_id": 1, "rank": 1, "badges": []}]
+        assert result["last_updated"] == "2024-01-01T00:00:00"
+
+
+@pytest.mark.asyncio
+class TestTableAvailable:
+    """Test the memoized table-existence check."""
+
+    @patch("src.api.db.gamification.get_existing_tables")
+    @patch("src.api.db.gamification.db_pool")
+    async def test_table_available_memoizes_positive(
+        self, mock_pool, mock_get_existing_tables
+    ):
+        """Test a table found once is not looked up again."""
+        mock_conn = AsyncMock()
+        mock_conn.__aenter__.return_value = mock_conn
+        mock_pool.acquire.return_value = mock_conn
+        mock_get_existing_tables.return_value = {"learning_sessions"}
+
+        with patch.object(gamification, "_known_tables", set()):
+            assert await table_available("learning_sessions") is True
+            assert await table_available("learning_sessions") is True
+
+        mock_get_existing_tables.assert_called_once()
+
+    @patch("src.api.db.gamification.get_existing_tables")
+    @patch("src.api.db.gamification.db_pool")
+    async def test_table_available_rechecks_negative(
+        self, mock_pool, mock_get_existing_tables
+    ):
+        """Test a missing table is looked up again on the next call."""
+        mock_conn = AsyncMock()
+        mock_conn.__aenter__.return_value = mock_conn
+        mock_pool.acquire.return_value = mock_conn
+        mock_get_existing_tables.side_effect = [set(), {"weekly_quests"}]
+
+        with patch.object(gamification, "_known_tables", set()):
+            assert await table_available("weekly_quests") is False
+            assert await table_available("weekly_quests") is True
+
+        assert mock_get_existing_tables.call_count == 2
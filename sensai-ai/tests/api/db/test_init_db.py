@@ -1,4 +1,5 @@
 import pytest
+import sqlite3
 from unittest.mock import patch, AsyncMock, MagicMock
 from src.api.db import (
     create_organizations_table,
@@ -20,10 +21,44 @@ from src.api.db import (
     create_course_generation_jobs_table,
     create_task_generation_jobs_table,
     create_code_drafts_table,
+    create_learning_sessions_table,
+    create_gamification_tables,
     init_db,
     delete_useless_tables,
+    migrate_gamification_tables,
 )
 
+ALL_TABLES = {
+    "organizations",
+    "org_api_keys",
+    "users",
+    "user_organizations",
+    "milestones",
+    "cohorts",
+    "courses",
+    "course_cohorts",
+    "tasks",
+    "questions",
+    "scorecards",
+    "question_scorecards",
+    "chat_history",
+    "task_completions",
+    "course_tasks",
+    "course_milestones",
+    "course_generation_jobs",
+    "task_generation_jobs",
+    "code_drafts",
+    "learning_sessions",
+    "weekly_quests",
+    "quest_completions",
+    "grace_tokens",
+    "leaderboard_cache",
+    "user_day_sessions",
+    "user_leaderboard_scores",
+    "mv_leaderboard_weekly",
+    "mv_leaderboard_monthly",
+}
+
 
 @pytest.mark.asyncio
 class TestTableCreationFunctions:
@@ -254,11 +289,52 @@ class TestTableCreationFunctions:
 
         await create_code_drafts_table(mock_cursor)
 
-        # Should execute CREATE TABLE and 2 CREATE INDEX statements
-        assert mock_cursor.execute.call_count == 3
+        # Should execute CREATE TABLE and 1 CREATE INDEX statement
+        assert mock_cursor.execute.call_count == 2
         calls = [call[0][0] for call in mock_cursor.execute.call_args_list]
 
         assert any("CREATE TABLE IF NOT EXISTS code_drafts" in call for call in calls)
+        # user_id lookups are covered by UNIQUE(user_id, question_id)
+        assert not any("idx_code_drafts_user_id" in call for call in calls)
+
+    async def test_create_learning_sessions_table(self):
+        """Test creating learning sessions table."""
+        mock_cursor = AsyncMock()
+
+        await create_learning_sessions_table(mock_cursor)
+
+        # Should execute CREATE TABLE and 4 CREATE INDEX statements
+        assert mock_cursor.execute.call_count == 5
+        calls = [call[0][0] for call in mock_cursor.execute.call_args_list]
+
+        assert any(
+            "CREATE TABLE IF NOT EXISTS learning_sessions" in call for call in calls
+        )
+
+    async def test_create_gamification_tables(self):
+        """Test all gamification DDL runs as one script in one transaction."""
+        mock_cursor = AsyncMock()
+
+        await create_gamification_tables(mock_cursor)
+
+        mock_cursor.execute.assert_not_called()
+        mock_cursor.executescript.assert_called_once()
+        script = mock_cursor.executescript.call_args[0][0]
+
+        assert script.startswith("BEGIN;")
+        assert script.endswith("COMMIT;")
+        for table_name in [
+            "learning_sessions",
+            "weekly_quests",
+            "quest_completions",
+            "grace_tokens",
+            "leaderboard_cache",
+            "user_day_sessions",
+            "user_leaderboard_scores",
+            "mv_leaderboard_weekly",
+            "mv_leaderboard_monthly",
+        ]:
+            assert f"CREATE TABLE IF NOT EXISTS {table_name}" in script
 
 
 @pytest.mark.asyncio
@@ -270,12 +346,12 @@ class TestDatabaseInitialization:
     @patch("src.api.db.os.path.exists")
     @patch("src.api.db.os.makedirs")
     @patch("src.api.db.get_new_db_connection")
-    @patch("src.api.db.check_table_exists")
+    @patch("src.api.db.get_existing_tables")
     @patch("src.api.db.set_db_defaults")
     async def test_init_db_creates_database_directory(
         self,
         mock_set_defaults,
-        mock_check_table,
+        mock_existing_tables,
         mock_get_conn,
         mock_makedirs,
         mock_path_exists,
@@ -289,7 +365,7 @@ class TestDatabaseInitialization:
         mock_conn.cursor.return_value = mock_cursor
         mock_conn.__aenter__.return_value = mock_conn
         mock_get_conn.return_value = mock_conn
-        mock_check_table.return_value = False
+        mock_existing_tables.return_value = set()
 
         await init_db()
 
@@ -300,12 +376,12 @@ class TestDatabaseInitialization:
     @patch("src.api.db.os.path.exists")
     @patch("src.api.db.os.makedirs")
     @patch("src.api.db.get_new_db_connection")
-    @patch("src.api.db.check_table_exists")
+    @patch("src.api.db.get_existing_tables")
     @patch("src.api.db.set_db_defaults")
     async def test_init_db_skips_directory_creation_if_exists(
         self,
         mock_set_defaults,
-        mock_check_table,
+        mock_existing_tables,
         mock_get_conn,
         mock_makedirs,
         mock_path_exists,
@@ -319,7 +395,7 @@ class TestDatabaseInitialization:
         mock_conn.cursor.return_value = mock_cursor
         mock_conn.__aenter__.return_value = mock_conn
         mock_get_conn.return_value = mock_conn
-        mock_check_table.return_value = False
+        mock_existing_tables.return_value = set()
 
         await init_db()
 
@@ -329,12 +405,12 @@ class TestDatabaseInitialization:
     @patch("src.api.db.exists")
     @patch("src.api.db.os.path.exists")
     @patch("src.api.db.get_new_db_connection")
-    @patch("src.api.db.check_table_exists")
+    @patch("src.api.db.get_existing_tables")
     @patch("src.api.db.set_db_defaults")
     async def test_init_db_creates_all_tables(
         self,
         mock_set_defaults,
-        mock_check_table,
+        mock_existing_tables,
         mock_get_conn,
         mock_path_exists,
         mock_exists,
@@ -347,7 +423,7 @@ class TestDatabaseInitialization:
         mock_conn.cursor.return_value = mock_cursor
         mock_conn.__aenter__.return_value = mock_conn
         mock_get_conn.return_value = mock_conn
-        mock_check_table.return_value = False
+        mock_existing_tables.return_value = set()
 
         await init_db()
 
@@ -359,12 +435,12 @@ class TestDatabaseInitialization:
     @patch("src.api.db.exists")
     @patch("src.api.db.os.path.exists")
     @patch("src.api.db.get_new_db_connection")
-    @patch("src.api.db.check_table_exists")
+    @patch("src.api.db.get_existing_tables")
     @patch("src.api.db.set_db_defaults")
     async def test_init_db_sets_defaults(
         self,
         mock_set_defaults,
-        mock_check_table,
+        mock_existing_tables,
         mock_get_conn,
         mock_path_exists,
         mock_exists,
@@ -377,30 +453,32 @@ class TestDatabaseInitialization:
         mock_conn.cursor.return_value = mock_cursor
         mock_conn.__aenter__.return_value = mock_conn
         mock_get_conn.return_value = mock_conn
-        mock_check_table.return_value = False
+        mock_existing_tables.return_value = set()
 
         await init_db()
 
         mock_set_defaults.assert_called_once()
 
+    @patch("src.api.db.migrate_gamification_tables")
     @patch("src.api.db.sqlite_db_path", "/test/path/test.db")
     @patch("src.api.db.exists")
     @patch("src.api.db.os.path.exists")
     @patch("src.api.db.get_new_db_connection")
-    @patch("src.api.db.check_table_exists")
+    @patch("src.api.db.get_existing_tables")
     @patch("src.api.db.set_db_defaults")
     async def test_init_db_existing_db_creates_missing_code_drafts_table(
         self,
         mock_set_defaults,
-        mock_check_table,
+        mock_existing_tables,
         mock_get_conn,
         mock_path_exists,
         mock_exists,
+        mock_migrate,
     ):
         """Test that init_db creates code_drafts table if database exists but table is missing."""
         mock_exists.return_value = True  # Database exists
         mock_path_exists.return_value = True  # Directory exists
-        mock_check_table.return_value = False  # code_drafts table doesn't exist
+        mock_existing_tables.return_value = ALL_TABLES - {"code_drafts"}
         mock_cursor = AsyncMock()
         mock_conn = AsyncMock()
         mock_conn.cursor.return_value = mock_cursor
@@ -409,30 +487,33 @@ class TestDatabaseInitialization:
 
         await init_db()
 
-        # Should create code_drafts table (CREATE TABLE + 2 CREATE INDEX statements)
-        assert mock_cursor.execute.call_count == 3
+        mock_migrate.assert_called_once_with(mock_cursor, ALL_TABLES - {"code_drafts"})
+        # Should create code_drafts table (CREATE TABLE + 1 CREATE INDEX statement)
+        assert mock_cursor.execute.call_count == 2
         mock_conn.commit.assert_called_once()
         # Should not set defaults when database already exists
         mock_set_defaults.assert_not_called()
 
+    @patch("src.api.db.migrate_gamification_tables")
     @patch("src.api.db.sqlite_db_path", "/test/path/test.db")
     @patch("src.api.db.exists")
     @patch("src.api.db.os.path.exists")
     @patch("src.api.db.get_new_db_connection")
-    @patch("src.api.db.check_table_exists")
+    @patch("src.api.db.get_existing_tables")
     @patch("src.api.db.set_db_defaults")
     async def test_init_db_existing_db_with_all_tables(
         self,
         mock_set_defaults,
-        mock_check_table,
+        mock_existing_tables,
         mock_get_conn,
         mock_path_exists,
         mock_exists,
+        mock_migrate,
     ):
         """Test that init_db does nothing when database and all tables exist."""
         mock_exists.return_value = True  # Database exists
         mock_path_exists.return_value = True  # Directory exists
-        mock_check_table.return_value = True  # code_drafts table exists
+        mock_existing_tables.return_value = ALL_TABLES
         mock_cursor = AsyncMock()
         mock_conn = AsyncMock()
         mock_conn.cursor.return_value = mock_cursor
@@ -441,9 +522,11 @@ class TestDatabaseInitialization:
 
         await init_db()
 
+        mock_migrate.assert_called_once_with(mock_cursor, ALL_TABLES)
         # Should only commit, no table creation
         mock_cursor.execute.assert_not_called()
         mock_conn.commit.assert_called_once()
+        mock_conn.execute.assert_any_call("PRAGMA optimize")
         # Should not set defaults when database already exists
         mock_set_defaults.assert_not_called()
 
@@ -451,14 +534,14 @@ class TestDatabaseInitialization:
     @patch("src.api.db.exists")
     @patch("src.api.db.os.path.exists")
     @patch("src.api.db.get_new_db_connection")
-    @patch("src.api.db.check_table_exists")
+    @patch("src.api.db.get_existing_tables")
     @patch("src.api.db.set_db_defaults")
     @patch("src.api.db.os.remove")
     async def test_init_db_exception_handling_removes_db(
         self,
         mock_remove,
         mock_set_defaults,
-        mock_check_table,
+        mock_existing_tables,
         mock_get_conn,
         mock_path_exists,
         mock_exists,
@@ -471,7 +554,7 @@ class TestDatabaseInitialization:
         mock_conn.cursor.return_value = mock_cursor
         mock_conn.__aenter__.return_value = mock_conn
         mock_get_conn.return_value = mock_conn
-        mock_check_table.return_value = False
+        mock_existing_tables.return_value = set()
 
         # Make cursor.execute raise an exception
         test_exception = Exception("Database error")
@@ -501,3 +584,406 @@ class TestDatabaseInitialization:
         assert mock_cursor.execute.call_count >= 8  # At least 8 DROP TABLE statements
         calls = [call[0][0] for call in mock_cursor.execute.call_args_list]
         assert any("DROP TABLE" in call for call in calls)
+
+    async def test_migrate_gamification_tables_adds_session_quality_score(self):
+        """Test the generated quality score column is added when missing."""
+        mock_cursor = AsyncMock()
+        mock_cursor.fetchall.return_value = [(0, "id"), (1, "user_id")]
+
+        await migrate_gamification_tables(mock_cursor, {"learning_sessions"})
+
+        calls = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        assert "PRAGMA table_xinfo(learning_sessions)" in calls
+        assert any(
+            "ADD COLUMN session_quality_score" in call and "VIRTUAL" in call
+            for call in calls
+        )
+
+    async def test_migrate_gamification_tables_keeps_existing_quality_score(self):
+        """Test an up to date learning_sessions table is left alone."""
+        mock_cursor = AsyncMock()
+        mock_cursor.fetchall.return_value = [(0, "id"), (1, "session_quality_score")]
+
+        await migrate_gamification_tables(mock_cursor, {"learning_sessions"})
+
+        calls = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        assert not any("ALTER TABLE" in call for call in calls)
+
+    async def test_migrate_gamification_tables_backfills_quest_progress_columns(
+        self,
+    ):
+        """Test missing quest progress columns are added and filled from the JSON."""
+        mock_cursor = AsyncMock()
+        mock_cursor.fetchall.return_value = [(0, "id"), (1, "active_minutes")]
+
+        await migrate_gamification_tables(mock_cursor, {"quest_completions"})
+
+        calls = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        assert not any("ADD COLUMN active_minutes" in call for call in calls)
+        assert any("ADD COLUMN dp_passes INTEGER DEFAULT 0" in call for call in calls)
+        backfill = [
+            call for call in calls if call.startswith("UPDATE quest_completions")
+        ]
+        assert len(backfill) == 1
+        assert "json_extract(progress, '$.dp_passes')" in backfill[0]
+        assert "$.active_minutes" not in backfill[0]
+
+    async def test_migrate_gamification_tables_converts_grace_token_times(self):
+        """Test text grace token times are converted to REAL unix seconds."""
+        mock_cursor = AsyncMock()
+
+        await migrate_gamification_tables(mock_cursor, {"grace_tokens"})
+
+        calls = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        for col in ["granted_date", "used_date", "expires_at"]:
+            assert (
+                f"UPDATE grace_tokens SET {col} = (julianday({col}) - 2440587.5) * 86400.0 WHERE typeof({col}) = 'text'"
+                in calls
+            )
+
+    async def test_migrate_gamification_tables_skips_missing_tables(self):
+        """Test nothing is migrated for tables that do not exist yet."""
+        mock_cursor = AsyncMock()
+
+        await migrate_gamification_tables(mock_cursor, set())
+
+        calls = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        assert calls
+        assert all(call.startswith("DROP INDEX IF EXISTS") for call in calls)
+
+    async def test_migrate_gamification_tables_adds_missing_indexes(self):
+        """Test indexes are created only on the tables that exist."""
+        mock_cursor = AsyncMock()
+        mock_cursor.fetchall.return_value = []
+
+        await migrate_gamification_tables(
+            mock_cursor, {"learning_sessions", "quest_completions"}
+        )
+
+        calls = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        assert any("idx_learning_sessions_user_start_metrics" in call for call in calls)
+        assert any(
+            "idx_quest_completions_user_completed" in call
+            and "WHERE is_completed = 1" in call
+            for call in calls
+        )
+        assert not any(
+            call.startswith("CREATE INDEX") and " ON grace_tokens " in call
+            for call in calls
+        )
+
+    async def test_migrate_gamification_tables_drops_superseded_indexes(self):
+        """Test narrower indexes and ones shadowed by UNIQUE constraints are dropped."""
+        mock_cursor = AsyncMock()
+
+        await migrate_gamification_tables(mock_cursor, set())
+
+        calls = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        for index_name in [
+            "idx_learning_sessions_user_id",
+            "idx_learning_sessions_user_start",
+            "idx_quest_completions_user_id",
+            "idx_quest_completions_quest_id",
+            "idx_weekly_quests_org",
+            "idx_grace_tokens_user_id",
+            "idx_leaderboard_cache_type_scope",
+            "idx_user_leaderboard_scores_active_minutes",
+            "idx_code_drafts_user_id",
+            "idx_weekly_quests_week_name",
+        ]:
+            assert f"DROP INDEX IF EXISTS {index_name}" in calls
+
+    async def test_migrate_gamification_tables_converts_session_start_to_epoch(
+        self,
+    ):
+        """Test text session_start values are converted to unix seconds."""
+        mock_cursor = AsyncMock()
+        mock_cursor.fetchall.return_value = []
+
+        await migrate_gamification_tables(mock_cursor, {"learning_sessions"})
+
+        calls = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        assert any(
+            "UPDATE learning_sessions SET session_start = CAST(strftime('%s', session_start) AS INTEGER)"
+            in call
+            and "WHERE typeof(session_start) = 'text'" in call
+            for call in calls
+        )
+
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    """Point init_db and its connections at a real SQLite file."""
+    path = str(tmp_path / "db.sqlite")
+    monkeypatch.setattr("src.api.db.sqlite_db_path", path)
+    monkeypatch.setattr("api.utils.db.sqlite_db_path", path)
+    return path
+
+
+def read_schema(path, object_type):
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = ? AND name NOT LIKE 'sqlite_%'",
+            (object_type,),
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row[0] for row in rows}
+
+
+# The gamification tables as the first release created them, before
+# session_start became unix seconds, grace token times became REAL and the
+# quest progress moved out of the JSON into its own columns
+BASELINE_GAMIFICATION_SCHEMA = """
+CREATE TABLE learning_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    task_id INTEGER,
+    question_id INTEGER,
+    session_start DATETIME NOT NULL,
+    session_end DATETIME,
+    total_minutes INTEGER DEFAULT 0,
+    active_minutes INTEGER DEFAULT 0,
+    interactions_count INTEGER DEFAULT 0,
+    learning_velocity REAL DEFAULT 0.0,
+    session_quality TEXT CHECK(session_quality IN ('high', 'medium', 'low')) DEFAULT 'medium',
+    is_completed BOOLEAN DEFAULT FALSE,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_learning_sessions_user_id ON learning_sessions (user_id);
+CREATE INDEX idx_learning_sessions_task_id ON learning_sessions (task_id);
+CREATE INDEX idx_learning_sessions_date ON learning_sessions (session_start);
+CREATE TABLE weekly_quests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    quest_name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    week_start DATE NOT NULL,
+    week_end DATE NOT NULL,
+    org_id INTEGER,
+    cohort_id INTEGER,
+    requirements JSON NOT NULL,
+    rewards JSON NOT NULL,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE quest_completions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    quest_id INTEGER NOT NULL,
+    progress JSON NOT NULL,
+    is_completed BOOLEAN DEFAULT FALSE,
+    completed_at DATETIME,
+    points_earned INTEGER DEFAULT 0,
+    badges_earned JSON,
+    proof_data JSON,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(user_id, quest_id)
+);
+CREATE INDEX idx_quest_completions_user_id ON quest_completions (user_id);
+CREATE INDEX idx_quest_completions_quest_id ON quest_completions (quest_id);
+CREATE TABLE grace_tokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    token_type TEXT NOT NULL CHECK(token_type IN ('session_extension', 'quest_retry', 'streak_save', 'quality_adjustment')),
+    granted_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    used_date DATETIME,
+    reason TEXT NOT NULL,
+    quest_id INTEGER,
+    session_id INTEGER,
+    is_used BOOLEAN DEFAULT FALSE,
+    expires_at DATETIME
+);
+CREATE INDEX idx_grace_tokens_user_id ON grace_tokens (user_id);
+CREATE INDEX idx_grace_tokens_type ON grace_tokens (token_type);
+"""
+
+
+@pytest.fixture
+def baseline_db_file(db_file):
+    """A database file holding gamification data in the first release's schema."""
+    conn = sqlite3.connect(db_file)
+    conn.executescript(BASELINE_GAMIFICATION_SCHEMA)
+    conn.executescript(
+        """
+        INSERT INTO learning_sessions (user_id, session_start, active_minutes, session_quality)
+        VALUES (1, '2024-03-01 10:00:00', 30, 'high'),
+               (1, '2024-03-01T12:00:00', 10, 'low'),
+               (2, '2024-03-02 09:00:00', 20, 'medium');
+        INSERT INTO weekly_quests (id, quest_name, description, week_start, week_end, requirements, rewards)
+        VALUES (1, 'Quest', 'Desc', '2024-03-01', '2024-03-07', '{}', '{}');
+        INSERT INTO quest_completions (user_id, quest_id, progress, is_completed, completed_at)
+        VALUES (1, 1, '{"active_minutes": 40, "dp_passes": 2, "completion_percentage": 50.0}', 1, '2024-03-02 00:00:00');
+        INSERT INTO grace_tokens (user_id, token_type, reason, granted_date)
+        VALUES (1, 'streak_save', 'Missed a day', '2024-03-01 00:00:00');
+        """
+    )
+    conn.close()
+    return db_file
+
+
+def query(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.mark.asyncio
+class TestInitDbOnDisk:
+    """Run init_db against real database files."""
+
+    async def test_init_db_creates_new_database(self, db_file):
+        """Test a new database gets every table, index and trigger."""
+        await init_db()
+
+        assert ALL_TABLES <= read_schema(db_file, "table")
+        assert "idx_learning_sessions_user_start_metrics" in read_schema(
+            db_file, "index"
+        )
+        assert "trg_learning_sessions_day_insert" in read_schema(db_file, "trigger")
+
+        conn = sqlite3.connect(db_file)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+
+    async def test_init_db_gamification_ids_skip_autoincrement(self, db_file):
+        """Test the gamification tables use plain rowid ids without AUTOINCREMENT."""
+        await init_db()
+
+        assert (
+            query(
+                db_file,
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%AUTOINCREMENT%' AND name IN ('learning_sessions', 'weekly_quests', 'quest_completions', 'grace_tokens', 'leaderboard_cache')",
+            )
+            == []
+        )
+
+    async def test_init_db_rejects_malformed_quest_json(self, db_file):
+        """Test quest requirements and rewards must be valid JSON on write."""
+        await init_db()
+
+        conn = sqlite3.connect(db_file)
+        try:
+            insert_sql = "INSERT INTO weekly_quests (quest_name, description, week_start, week_end, requirements, rewards) VALUES ('Q', 'D', '2024-03-04', '2024-03-10', ?, ?)"
+            with pytest.raises(sqlite3.IntegrityError, match="valid JSON"):
+                conn.execute(insert_sql, ("{not json", "{}"))
+            with pytest.raises(sqlite3.IntegrityError, match="valid JSON"):
+                conn.execute(insert_sql, ("{}", "[1,"))
+
+            conn.execute(insert_sql, ('{"active_minutes": 60}', "{}"))
+            with pytest.raises(sqlite3.IntegrityError, match="valid JSON"):
+                conn.execute("UPDATE weekly_quests SET rewards = 'nope'")
+        finally:
+            conn.close()
+
+    async def test_init_db_new_database_creates_tables_in_one_batch(self, db_file):
+        """Test a new database takes the path that creates tables in one batch."""
+        with patch(
+            "src.api.db.create_gamification_tables", wraps=create_gamification_tables
+        ) as mock_create, patch("src.api.db.get_existing_tables") as mock_existing:
+            await init_db()
+
+        mock_create.assert_called_once()
+        mock_existing.assert_not_called()
+
+    async def test_init_db_upgrades_baseline_database(self, baseline_db_file):
+        """Test a database from the first release is migrated and its rollups seeded."""
+        await init_db()
+
+        assert ALL_TABLES <= read_schema(baseline_db_file, "table")
+        assert query(
+            baseline_db_file,
+            "SELECT session_start, typeof(session_start), session_quality_score FROM learning_sessions ORDER BY id",
+        ) == [
+            (1709287200, "integer", 3.0),
+            (1709294400, "integer", 1.0),
+            (1709370000, "integer", 2.0),
+        ]
+        assert query(
+            baseline_db_file,
+            "SELECT user_id, day, active_minutes, quality_sum, quality_count, sessions FROM user_day_sessions ORDER BY user_id",
+        ) == [(1, 19783, 40, 4.0, 2, 2), (2, 19784, 20, 2.0, 1, 1)]
+        assert query(
+            baseline_db_file,
+            "SELECT active_minutes, dp_passes, peer_reviews, completion_percentage FROM quest_completions",
+        ) == [(40, 2, 0, 50.0)]
+        assert query(
+            baseline_db_file,
+            "SELECT granted_date, typeof(granted_date) FROM grace_tokens",
+        ) == [(1709251200, "integer")]
+
+        indexes = read_schema(baseline_db_file, "index")
+        assert {
+            "idx_learning_sessions_user_start_metrics",
+            "idx_learning_sessions_active",
+            "idx_quest_completions_quest_completion",
+            "idx_quest_completions_user_completed",
+            "idx_grace_tokens_user_granted",
+            "idx_grace_tokens_unused",
+            "idx_weekly_quests_org_week",
+            "idx_weekly_quests_cohort_week",
+        } <= indexes
+        assert (
+            not {
+                "idx_learning_sessions_user_id",
+                "idx_quest_completions_user_id",
+                "idx_quest_completions_quest_id",
+                "idx_grace_tokens_user_id",
+            }
+            & indexes
+        )
+
+    async def test_init_db_upgrade_validates_quest_json(self, baseline_db_file):
+        """Test an upgraded database rejects malformed quest JSON like a new one."""
+        await init_db()
+
+        conn = sqlite3.connect(baseline_db_file)
+        try:
+            with pytest.raises(sqlite3.IntegrityError, match="valid JSON"):
+                conn.execute("UPDATE weekly_quests SET requirements = '{' WHERE id = 1")
+        finally:
+            conn.close()
+
+    async def test_init_db_upgrade_is_idempotent(self, baseline_db_file):
+        """Test running init_db again on an upgraded database changes nothing."""
+        await init_db()
+        schema = query(baseline_db_file, "SELECT type, name, sql FROM sqlite_master")
+        sessions = query(baseline_db_file, "SELECT * FROM user_day_sessions")
+
+        await init_db()
+
+        assert query(baseline_db_file, "SELECT type, name, sql FROM sqlite_master") == (
+            schema
+        )
+        assert query(baseline_db_file, "SELECT * FROM user_day_sessions") == sessions
+
+    async def test_init_db_upgrade_seeds_leaderboard_scores(self, baseline_db_file):
+        """Test the all-time totals are seeded from upgraded data and kept current."""
+        await init_db()
+
+        scores_sql = "SELECT user_id, active_minutes, sessions, quality_sum, quality_count, quests_completed FROM user_leaderboard_scores ORDER BY user_id"
+        assert query(baseline_db_file, scores_sql) == [
+            (1, 40, 2, 4.0, 2, 1),
+            (2, 20, 1, 2.0, 1, 0),
+        ]
+
+        conn = sqlite3.connect(baseline_db_file)
+        conn.execute(
+            "INSERT INTO learning_sessions (user_id, session_start, active_minutes, session_quality) VALUES (2, 1709380800, 15, 'high')"
+        )
+        conn.execute(
+            "UPDATE learning_sessions SET session_quality = 'high' WHERE id = 2"
+        )
+        conn.commit()
+        conn.close()
+
+        assert query(baseline_db_file, scores_sql) == [
+            (1, 40, 2, 6.0, 2, 1),
+            (2, 35, 2, 5.0, 2, 0),
+        ]
+        assert query(
+            baseline_db_file,
+            "SELECT user_id, day, active_minutes, quality_sum, sessions FROM user_day_sessions ORDER BY user_id",
+        ) == [(1, 19783, 40, 6.0, 2), (2, 19784, 35, 5.0, 2)]
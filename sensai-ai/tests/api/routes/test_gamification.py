@@ -0,0 +1,292 @@
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from src.api.routes.gamification import router
+from fastapi import FastAPI
+from api.models_gamification import (
+    GraceToken,
+    GraceTokenType,
+    LeaderboardEntry,
+    QuestCompletion,
+    QuestProgress,
+    WeeklyQuest,
+)
+
+# Create a test app with the gamification router
+app = FastAPI()
+app.include_router(router, prefix="/gamification")
+client = TestClient(app)
+
+
+def leaderboard_data(entries):
+    return {
+        "leaderboard_type": "cohort",
+        "scope_id": 4,
+        "time_period": "weekly",
+        "entries": entries,
+        "last_updated": datetime(2024, 1, 1),
+        "total_participants": len(entries),
+        "metadata": {},
+    }
+
+
+def leaderboard_entry(user_id, rank):
+    return LeaderboardEntry(
+        user_id=user_id,
+        user_name=f"User {user_id}",
+        user_email=f"user{user_id}@example.com",
+        score=100 - rank,
+        rank=rank,
+        active_minutes=100 - rank,
+        quests_completed=0,
+        streak_count=0,
+        session_quality_avg=0.5,
+    )
+
+
+class TestLeaderboardRoutes:
+    """Test leaderboard route endpoints."""
+
+    @patch("src.api.routes.gamification.get_cached_leaderboard")
+    @patch("src.api.routes.gamification.calculate_leaderboard")
+    def test_get_leaderboard_reads_ranked_scores(self, mock_calculate, mock_cached):
+        """Test a cache miss reads the ranked scores and highlights the user."""
+        mock_cached.return_value = None
+        mock_calculate.return_value = leaderboard_data(
+            [leaderboard_entry(1, 1), leaderboard_entry(2, 2)]
+        )
+
+        response = client.get(
+            "/gamification/leaderboards/cohort?time_period=weekly&scope_id=4&user_id=2&limit=10"
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [entry["user_id"] for entry in data["leaderboard"]["entries"]] == [1, 2]
+        assert data["user_rank"] == 2
+        assert data["user_entry"]["user_id"] == 2
+        mock_calculate.assert_called_once_with("cohort", "weekly", 4, 10)
+
+    @patch("src.api.routes.gamification.get_cached_leaderboard")
+    @patch("src.api.routes.gamification.calculate_leaderboard")
+    def test_get_leaderboard_user_not_ranked(self, mock_calculate, mock_cached):
+        """Test a user outside the returned entries has no rank."""
+        mock_cached.return_value = None
+        mock_calculate.return_value = leaderboard_data([leaderboard_entry(1, 1)])
+
+        response = client.get("/gamification/leaderboards/cohort?user_id=9")
+
+        assert response.status_code == 200
+        assert response.json()["user_rank"] is None
+        assert response.json()["user_entry"] is None
+
+    @patch("src.api.routes.gamification.get_cached_leaderboard")
+    @patch("src.api.routes.gamification.calculate_leaderboard")
+    def test_get_leaderboard_served_from_cache(self, mock_calculate, mock_cached):
+        """Test a cached board is trimmed to the limit without recalculating."""
+        # Cached boards come back as the decoded JSON, with plain dict entries
+        mock_cached.return_value = leaderboard_data(
+            [
+                leaderboard_entry(user_id, user_id).model_dump()
+                for user_id in range(1, 4)
+            ]
+        )
+
+        response = client.get(
+            "/gamification/leaderboards/cohort?scope_id=4&user_id=2&limit=2"
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [entry["user_id"] for entry in data["leaderboard"]["entries"]] == [1, 2]
+        assert data["leaderboard"]["total_participants"] == 2
+        assert data["user_rank"] == 2
+        mock_cached.assert_called_once_with("cohort", "weekly", 4)
+        mock_calculate.assert_not_called()
+
+    @patch("src.api.routes.gamification.get_cached_leaderboard")
+    @patch("src.api.routes.gamification.calculate_leaderboard")
+    def test_get_leaderboard_above_cached_limit(self, mock_calculate, mock_cached):
+        """Test a limit beyond the cached entries skips the cache."""
+        mock_calculate.return_value = leaderboard_data([leaderboard_entry(1, 1)])
+
+        response = client.get("/gamification/leaderboards/cohort?limit=500")
+
+        assert response.status_code == 200
+        mock_cached.assert_not_called()
+        mock_calculate.assert_called_once_with("cohort", "weekly", None, 500)
+
+    def test_get_leaderboard_types(self):
+        """Test the types endpoint is not captured by the leaderboard route."""
+        response = client.get("/gamification/leaderboards/types")
+
+        assert response.status_code == 200
+        assert response.json() == ["course", "cohort", "topic", "campus", "global"]
+
+
+class TestQuestRoutes:
+    """Test quest route endpoints."""
+
+    @patch("src.api.routes.gamification.update_quest_progress")
+    @patch("src.api.routes.gamification.calculate_quest_progress")
+    @patch("src.api.routes.gamification.get_quest_by_id")
+    def test_update_user_quest_progress(
+        self, mock_get_quest, mock_calculate, mock_update
+    ):
+        """Test progress is recalculated for the quest looked up by id."""
+        quest = WeeklyQuest(
+            id=7,
+            quest_name="Quest",
+            description="Description",
+            week_start=datetime(2024, 1, 1),
+            week_end=datetime(2024, 1, 7),
+            requirements={},
+            rewards={},
+        )
+        mock_get_quest.return_value = quest
+        mock_calculate.return_value = QuestProgress(completion_percentage=1.0)
+
+        response = client.post("/gamification/users/5/quests/7/update-progress")
+
+        assert response.status_code == 200
+        assert response.json()["is_completed"] is True
+        mock_get_quest.assert_called_once_with(7)
+        mock_calculate.assert_called_once_with(5, quest)
+        mock_update.assert_called_once()
+
+    @patch("src.api.routes.gamification.get_quest_by_id")
+    def test_update_user_quest_progress_quest_not_found(self, mock_get_quest):
+        """Test progress for an unknown quest is rejected."""
+        mock_get_quest.return_value = None
+
+        response = client.post("/gamification/users/5/quests/7/update-progress")
+
+        assert response.status_code == 400
+        assert "Quest not found" in response.json()["detail"]
+
+
+class TestGraceTokenRoutes:
+    """Test grace token route endpoints."""
+
+    @patch("src.api.routes.gamification.count_unused_grace_tokens")
+    @patch("src.api.routes.gamification.grant_grace_token")
+    def test_grant_token(self, mock_grant, mock_count):
+        """Test the granted token and remaining count come from one insert and one count."""
+        mock_grant.return_value = GraceToken(
+            id=3,
+            user_id=1,
+            token_type=GraceTokenType.STREAK_SAVE,
+            granted_date=datetime(2024, 1, 1),
+            reason="reason",
+        )
+        mock_count.return_value = 2
+
+        response = client.post(
+            "/gamification/grace-tokens/",
+            json={"user_id": 1, "token_type": "streak_save", "reason": "reason"},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["token"]["id"] == 3
+        assert response.json()["remaining_tokens"] == 2
+        mock_count.assert_called_once_with(1)
+
+
+class TestProfileRoutes:
+    """Test user profile route endpoints."""
+
+    @patch("src.api.routes.gamification.get_user_active_sessions")
+    @patch("src.api.routes.gamification.get_user_grace_tokens")
+    @patch("src.api.routes.gamification.get_user_quest_progress")
+    @patch("src.api.routes.gamification.get_active_quests")
+    @patch("src.api.routes.gamification.get_user_session_metrics")
+    def test_get_user_gamification_profile(
+        self,
+        mock_metrics,
+        mock_active_quests,
+        mock_quest_progress,
+        mock_grace_tokens,
+        mock_active_sessions,
+    ):
+        """Test the profile gathers metrics, quest progress, tokens and sessions."""
+        mock_metrics.return_value = {
+            "total_sessions": 2,
+            "total_active_minutes": 90,
+            "avg_velocity": 1.0,
+            "avg_quality_score": 2.5,
+            "completed_sessions": 1,
+        }
+        mock_active_quests.return_value = [
+            WeeklyQuest(
+                id=quest_id,
+                quest_name="Quest",
+                description="Description",
+                week_start=datetime(2024, 1, 1),
+                week_end=datetime(2024, 1, 7),
+                requirements={},
+                rewards={},
+            )
+            for quest_id in [1, 2]
+        ]
+        progress = QuestCompletion(
+            user_id=5,
+            quest_id=1,
+            progress=QuestProgress(completion_percentage=0.5),
+        )
+        mock_quest_progress.side_effect = lambda user_id, quest_id: (
+            progress if quest_id == 1 else None
+        )
+        mock_grace_tokens.return_value = []
+        mock_active_sessions.return_value = []
+
+        response = client.get("/gamification/users/5/gamification-profile")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [quest["quest_id"] for quest in data["profile"]["current_quests"]] == [1]
+        assert data["next_milestones"] == {"next_quest_completion": "50.0%"}
+        assert mock_quest_progress.call_count == 2
+        mock_metrics.assert_called_once_with(5, days=30)
+        mock_grace_tokens.assert_any_call(5, unused_only=False)
+        mock_grace_tokens.assert_any_call(5, unused_only=True)
+
+
+class TestAdminRoutes:
+    """Test admin route endpoints."""
+
+    @patch("src.api.routes.gamification.cache_leaderboard")
+    @patch("src.api.routes.gamification.calculate_leaderboard")
+    @patch("src.api.routes.gamification.refresh_leaderboard_views")
+    def test_refresh_all_leaderboards(
+        self, mock_refresh_views, mock_calculate, mock_cache
+    ):
+        """Test every leaderboard type and period is recalculated and cached."""
+        mock_calculate.return_value = leaderboard_data([])
+
+        response = client.post("/gamification/admin/refresh-leaderboards")
+
+        assert response.status_code == 200
+        assert response.json()["refreshed_count"] == 15
+        mock_refresh_views.assert_called_once()
+        assert mock_calculate.call_count == 15
+        assert mock_cache.call_count == 15
+
+    @patch("src.api.routes.gamification.cache_leaderboard")
+    @patch("src.api.routes.gamification.calculate_leaderboard")
+    @patch("src.api.routes.gamification.refresh_leaderboard_views")
+    def test_refresh_all_leaderboards_failure(
+        self, mock_refresh_views, mock_calculate, mock_cache
+    ):
+        """Test a failing board is reported after the others finish."""
+        mock_calculate.side_effect = [Exception("Database error")] + [
+            leaderboard_data([])
+        ] * 14
+
+        response = client.post("/gamification/admin/refresh-leaderboards")
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == (
+            "1 of 15 leaderboards failed to refresh: course/weekly: Database error"
+        )
+        assert mock_cache.call_count == 14
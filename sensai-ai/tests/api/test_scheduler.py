@@ -6,6 +6,7 @@ from src.api.scheduler import (
     check_scheduled_tasks,
     daily_usage_stats,
     daily_traces,
+    refresh_leaderboards,
     ist_timezone,
 )
 
@@ -95,6 +96,13 @@ class TestScheduledTasks:
         # Verify the traces function was called
         mock_save_traces.assert_called_once()
 
+    @patch("src.api.scheduler.refresh_leaderboard_views")
+    async def test_refresh_leaderboards(self, mock_refresh_views):
+        """Test the refresh_leaderboards function."""
+        await refresh_leaderboards()
+
+        mock_refresh_views.assert_called_once()
+
 
 class TestSchedulerJobs:
     """Test scheduler job registration."""
@@ -113,6 +121,7 @@ class TestSchedulerJobs:
         assert "check_scheduled_tasks" in job_names
         assert "daily_usage_stats" in job_names
         assert "daily_traces" in job_names
+        assert "refresh_leaderboards" in job_names
 
     def test_check_scheduled_tasks_job_config(self):
         """Test check_scheduled_tasks job configuration."""
@@ -0,0 +1,117 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock
+from src.api.utils.cache import async_ttl_cache
+
+
+@pytest.mark.asyncio
+class TestAsyncTTLCache:
+    async def test_caches_result_per_arguments(self):
+        """Test repeated calls with the same arguments hit the cache."""
+        func = AsyncMock(side_effect=lambda x: x * 2)
+        cached = async_ttl_cache(ttl=60)(func)
+
+        assert await cached(2) == 4
+        assert await cached(2) == 4
+        assert await cached(3) == 6
+
+        assert func.call_count == 2
+
+    async def test_custom_key(self):
+        """Test calls mapping to the same key share a cache entry."""
+        func = AsyncMock(return_value="result")
+        cached = async_ttl_cache(key=lambda x=None: "same")(func)
+
+        await cached(1)
+        await cached(x=2)
+
+        func.assert_called_once_with(1)
+
+    async def test_cache_clear(self):
+        """Test cache_clear forces the next call to run again."""
+        func = AsyncMock(return_value="result")
+        cached = async_ttl_cache()(func)
+
+        await cached()
+        cached.cache_clear()
+        await cached()
+
+        assert func.call_count == 2
+
+    async def test_expires_after_ttl(self):
+        """Test entries are dropped once the ttl has passed."""
+        func = AsyncMock(return_value="result")
+        cached = async_ttl_cache(ttl=0.01)(func)
+
+        await cached()
+        await asyncio.sleep(0.02)
+        await cached()
+
+        assert func.call_count == 2
+
+    async def test_concurrent_misses_run_once(self):
+        """Test concurrent callers for the same key share one call."""
+        calls = 0
+
+        async def slow():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        cached = async_ttl_cache()(slow)
+
+        results = await asyncio.gather(cached(), cached(), cached())
+
+        assert results == ["result"] * 3
+        assert calls == 1
+
+    async def test_miss_does_not_block_other_keys(self):
+        """Test a slow call for one key doesn't hold up misses for another."""
+        release = asyncio.Event()
+
+        async def load(name):
+            if name == "slow":
+                await release.wait()
+            return name
+
+        cached = async_ttl_cache()(load)
+
+        slow = asyncio.ensure_future(cached("slow"))
+        await asyncio.sleep(0)
+        async with asyncio.timeout(1):
+            assert await cached("fast") == "fast"
+
+        release.set()
+        assert await slow == "slow"
+
+    async def test_callers_get_their_own_copy(self):
+        """Test changing a returned result doesn't change the cached one."""
+        cached = async_ttl_cache()(AsyncMock(return_value=[{"name": "quest"}]))
+
+        first = await cached()
+        first.append({"name": "extra"})
+        first[0]["name"] = "changed"
+
+        assert await cached() == [{"name": "quest"}]
+
+    async def test_cache_clear_drops_in_flight_result(self):
+        """Test a call already running when the cache is cleared isn't cached."""
+        release = asyncio.Event()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return calls
+
+        cached = async_ttl_cache()(load)
+
+        stale = asyncio.ensure_future(cached())
+        await asyncio.sleep(0)
+        cached.cache_clear()
+        release.set()
+
+        assert await stale == 1
+        assert await cached() == 2
@@ -12,6 +12,8 @@ from src.api.utils.db import (
     deserialise_list_from_str,
     trace_callback,
     check_table_exists,
+    get_existing_tables,
+    connection_pragmas,
 )
 
 
@@ -87,6 +89,22 @@ class TestCheckTableExists:
         mock_cursor.fetchone.assert_called_once()
 
 
+@pytest.mark.asyncio
+class TestGetExistingTables:
+    async def test_get_existing_tables(self):
+        """Test get_existing_tables looks up all names in one query."""
+        mock_cursor = AsyncMock()
+        mock_cursor.fetchall.return_value = [("users",), ("tasks",)]
+
+        result = await get_existing_tables(["users", "tasks", "missing"], mock_cursor)
+
+        assert result == {"users", "tasks"}
+        mock_cursor.execute.assert_called_once_with(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name IN (?,?,?)",
+            ["users", "tasks", "missing"],
+        )
+
+
 @pytest.mark.asyncio
 class TestDbConnections:
     @pytest.mark.skip(reason="Need to find a better way to mock async context managers")
@@ -103,7 +121,7 @@ class TestDbConnections:
         async with get_new_db_connection() as conn:
             assert conn == mock_conn
             # Now mock the methods used inside the context manager
-            mock_conn.execute.assert_called_once_with("PRAGMA synchronous=NORMAL;")
+            mock_conn.executescript.assert_called_once_with(connection_pragmas)
             mock_conn.set_trace_callback.assert_called_once()
 
         # Check that close was called after exiting the context
@@ -224,6 +242,32 @@ class TestDbOperations:
         )
         mock_conn.commit.assert_called_once()
 
+    @patch("src.api.utils.db.get_new_db_connection")
+    @patch("src.api.utils.db.db_pool")
+    async def test_execute_db_operation_readonly(self, mock_pool, mock_get_conn):
+        """Test execute_db_operation with readonly=True uses the reader pool."""
+        # Setup mocks
+        mock_conn = AsyncMock()
+        mock_cursor = AsyncMock()
+        mock_conn.__aenter__.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.fetchone.return_value = (1,)
+        mock_pool.acquire.return_value = mock_conn
+
+        # Call the function
+        result = await execute_db_operation(
+            "SELECT id FROM test WHERE id = ?",
+            params=(1,),
+            fetch_one=True,
+            readonly=True,
+        )
+
+        # Check results
+        assert result == (1,)
+        mock_pool.acquire.assert_called_once_with(readonly=True)
+        mock_get_conn.assert_not_called()
+        mock_conn.commit.assert_not_called()
+
     @patch("src.api.utils.db.get_new_db_connection")
     async def test_execute_many_db_operation(self, mock_get_conn):
         """Test execute_many_db_operation."""
@@ -0,0 +1,133 @@
+import asyncio
+import sqlite3
+import pytest
+from src.api.utils.db_pool import ConnectionPool
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "test.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.mark.asyncio
+class TestConnectionPool:
+    async def test_reader_connections_are_reused(self, db_path):
+        """Test that a released reader is handed out again."""
+        pool = ConnectionPool(db_path, "PRAGMA synchronous=NORMAL;", max_readers=2)
+
+        async with pool.acquire(readonly=True) as first:
+            pass
+        async with pool.acquire(readonly=True) as second:
+            pass
+
+        assert first is second
+        await pool.close()
+
+    async def test_readers_are_query_only(self, db_path):
+        """Test that reader connections refuse writes."""
+        pool = ConnectionPool(db_path, "PRAGMA synchronous=NORMAL;")
+
+        async with pool.acquire(readonly=True) as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                await conn.execute("INSERT INTO items (name) VALUES ('a')")
+
+        await pool.close()
+
+    async def test_writer_changes_visible_to_readers(self, db_path):
+        """Test that committed writes are seen by pooled readers."""
+        pool = ConnectionPool(db_path, "PRAGMA synchronous=NORMAL;")
+
+        async with pool.acquire() as conn:
+            await conn.execute("INSERT INTO items (name) VALUES ('a')")
+            await conn.commit()
+
+        async with pool.acquire(readonly=True) as conn:
+            cursor = await conn.execute("SELECT name FROM items")
+            assert await cursor.fetchall() == [("a",)]
+
+        await pool.close()
+
+    async def test_writer_rolls_back_on_exception(self, db_path):
+        """Test that a failed write block leaves no partial changes."""
+        pool = ConnectionPool(db_path, "PRAGMA synchronous=NORMAL;")
+
+        with pytest.raises(ValueError):
+            async with pool.acquire() as conn:
+                await conn.execute("INSERT INTO items (name) VALUES ('a')")
+                raise ValueError("boom")
+
+        async with pool.acquire(readonly=True) as conn:
+            cursor = await conn.execute("SELECT COUNT(*) FROM items")
+            assert (await cursor.fetchone())[0] == 0
+
+        await pool.close()
+
+    async def test_writer_rolls_back_when_cancelled(self, db_path):
+        """Test that a write block cancelled mid-write leaves no open transaction."""
+        pool = ConnectionPool(db_path, "PRAGMA synchronous=NORMAL;")
+        written = asyncio.Event()
+
+        async def write():
+            async with pool.acquire() as conn:
+                await conn.execute("INSERT INTO items (name) VALUES ('a')")
+                written.set()
+                await asyncio.sleep(10)
+                await conn.commit()
+
+        task = asyncio.create_task(write())
+        await written.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        async with pool.acquire() as conn:
+            assert not conn.in_transaction
+            await conn.execute("INSERT INTO items (name) VALUES ('b')")
+            await conn.commit()
+
+        async with pool.acquire(readonly=True) as conn:
+            cursor = await conn.execute("SELECT name FROM items")
+            assert await cursor.fetchall() == [("b",)]
+
+        await pool.close()
+
+    async def test_reader_count_is_bounded(self, db_path):
+        """Test that concurrent readers wait for a free connection."""
+        pool = ConnectionPool(db_path, "PRAGMA synchronous=NORMAL;", max_readers=2)
+        seen = set()
+
+        async def read():
+            async with pool.acquire(readonly=True) as conn:
+                seen.add(id(conn))
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(read() for _ in range(6)))
+
+        assert len(seen) == 2
+        await pool.close()
+
+    async def test_failed_reader_connect_frees_its_slot(self, db_path, tmp_path):
+        """Test a reader that fails to open does not use up the reader limit."""
+        pool = ConnectionPool(
+            str(tmp_path / "missing" / "test.sqlite"),
+            "PRAGMA synchronous=NORMAL;",
+            max_readers=1,
+        )
+
+        with pytest.raises(sqlite3.OperationalError):
+            async with pool.acquire(readonly=True):
+                pass
+
+        pool.db_path = db_path
+        async with asyncio.timeout(1):
+            async with pool.acquire(readonly=True) as conn:
+                cursor = await conn.execute("SELECT COUNT(*) FROM items")
+                assert (await cursor.fetchone())[0] == 0
+
+        await pool.close()
@@ -9,6 +9,7 @@ import os
 import sqlite3
 import asyncio
 import aiosqlite
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, date
 
 # Add the src directory to Python path to import our modules
@@ -43,524 +44,218 @@ from api.config import (
     quest_completions_table_name,
     grace_tokens_table_name,
     leaderboard_cache_table_name,
+    user_day_sessions_table_name,
+    user_leaderboard_scores_table_name,
+    weekly_leaderboard_view_table_name,
+    monthly_leaderboard_view_table_name,
 )
+from api.db import (
+    create_organizations_table,
+    create_org_api_keys_table,
+    create_users_table,
+    create_user_organizations_table,
+    create_milestones_table,
+    create_cohort_tables,
+    create_courses_table,
+    create_course_cohorts_table,
+    create_tasks_table,
+    create_questions_table,
+    create_scorecards_table,
+    create_question_scorecards_table,
+    create_chat_history_table,
+    create_task_completion_table,
+    create_course_tasks_table,
+    create_course_milestones_table,
+    create_course_generation_jobs_table,
+    create_task_generation_jobs_table,
+    create_code_drafts_table,
+    gamification_table_statements,
+    gamification_index_statements,
+    migrate_gamification_tables,
+)
+from api.utils.db import connection_pragmas, get_existing_tables
+
+# The backend's per-connection settings, plus WAL (which the backend sets once
+# when it initialises the database and which persists in the file)
+setup_pragmas = "PRAGMA journal_mode=WAL;" + connection_pragmas
+
+# The existing tables with the backend functions that create them, in
+# creation order; create_cohort_tables also creates user_cohorts
+core_tables = [
+    (organizations_table_name, create_organizations_table),
+    (org_api_keys_table_name, create_org_api_keys_table),
+    (users_table_name, create_users_table),
+    (user_organizations_table_name, create_user_organizations_table),
+    (milestones_table_name, create_milestones_table),
+    (cohorts_table_name, create_cohort_tables),
+    (courses_table_name, create_courses_table),
+    (course_cohorts_table_name, create_course_cohorts_table),
+    (tasks_table_name, create_tasks_table),
+    (questions_table_name, create_questions_table),
+    (scorecards_table_name, create_scorecards_table),
+    (question_scorecards_table_name, create_question_scorecards_table),
+    (chat_history_table_name, create_chat_history_table),
+    (task_completions_table_name, create_task_completion_table),
+    (course_tasks_table_name, create_course_tasks_table),
+    (course_milestones_table_name, create_course_milestones_table),
+    (course_generation_jobs_table_name, create_course_generation_jobs_table),
+    (task_generation_jobs_table_name, create_task_generation_jobs_table),
+    (code_drafts_table_name, create_code_drafts_table),
+]
+
+# The gamification tables, all created from gamification_table_statements
+gamification_tables = [
+    learning_sessions_table_name,
+    weekly_quests_table_name,
+    quest_completions_table_name,
+    grace_tokens_table_name,
+    leaderboard_cache_table_name,
+    user_day_sessions_table_name,
+    user_leaderboard_scores_table_name,
+    weekly_leaderboard_view_table_name,
+    monthly_leaderboard_view_table_name,
+]
+
+# Every table the setup creates, in creation order
+all_tables = (
+    [table_name for table_name, _ in core_tables]
+    + [user_cohorts_table_name]
+    + gamification_tables
+)
+
+# Per-table progress lines are only printed when SETUP_VERBOSE is set
+verbose = bool(os.getenv("SETUP_VERBOSE"))
+
+
+@asynccontextmanager
+async def connect():
+    """Open a connection configured like the backend's"""
+    # mode=rwc creates the database file if it does not exist yet, so the
+    # script can bootstrap a fresh deployment
+    async with aiosqlite.connect(f"file:{sqlite_db_path}?mode=rwc", uri=True) as conn:
+        await conn.executescript(setup_pragmas)
+        yield conn
+
+
+async def run_ddl(conn: aiosqlite.Connection, ddl_statements):
+    """Run a batch of DDL statements in one transaction"""
+    # One executescript call runs the whole batch in a single trip to
+    # aiosqlite's worker thread instead of one per statement. sqlite3
+    # does not open a transaction for DDL on its own, so the explicit
+    # BEGIN/COMMIT keeps every statement from being committed separately
+    await conn.executescript(
+        "BEGIN;\n" + ";\n".join(ddl_statements) + ";\nCOMMIT;"
+    )
 
-async def create_all_tables_force():
-    """Force create all tables including gamification ones"""
+
+async def create_all_tables(conn: aiosqlite.Connection):
+    """Create every table with the backend's own definitions, leaving the
+    gamification indexes to create_all_indexes"""
     
-    print(f"🗄️ Connecting to database: {sqlite_db_path}")
+    cursor = await conn.cursor()
+    existing_tables = await get_existing_tables(all_tables, cursor)
     
-    async with aiosqlite.connect(sqlite_db_path) as conn:
-        cursor = await conn.cursor()
-        
-        print("📋 Creating ALL database tables (including gamification)...")
-        
-        # 1. Organizations table
-        print("  🏢 Creating organizations table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {organizations_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                slug TEXT UNIQUE NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # 2. Org API Keys table
-        print("  🔐 Creating org_api_keys table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {org_api_keys_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                org_id INTEGER NOT NULL,
-                api_key_name TEXT NOT NULL,
-                encrypted_api_key TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (org_id) REFERENCES {organizations_table_name}(id) ON DELETE CASCADE,
-                UNIQUE(org_id, api_key_name)
-            )
-        """)
-        
-        # 3. Users table
-        print("  👤 Creating users table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {users_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                first_name TEXT,
-                middle_name TEXT,
-                last_name TEXT,
-                default_dp_color TEXT DEFAULT '#3B82F6',
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # 4. User Organizations table
-        print("  🔗 Creating user_organizations table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {user_organizations_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                org_id INTEGER NOT NULL,
-                role TEXT NOT NULL DEFAULT 'member',
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (org_id) REFERENCES {organizations_table_name}(id) ON DELETE CASCADE,
-                UNIQUE(user_id, org_id)
-            )
-        """)
-        
-        # 5. Milestones table
-        print("  🎯 Creating milestones table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {milestones_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                color TEXT NOT NULL DEFAULT '#3B82F6',
-                org_id INTEGER NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (org_id) REFERENCES {organizations_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 6. Cohorts table
-        print("  👥 Creating cohorts table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {cohorts_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                org_id INTEGER NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (org_id) REFERENCES {organizations_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 7. User Cohorts table
-        print("  🔗 Creating user_cohorts table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {user_cohorts_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                cohort_id INTEGER NOT NULL,
-                role TEXT NOT NULL DEFAULT 'learner',
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (cohort_id) REFERENCES {cohorts_table_name}(id) ON DELETE CASCADE,
-                UNIQUE(user_id, cohort_id)
-            )
-        """)
-        
-        # 8. Courses table
-        print("  📚 Creating courses table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {courses_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                org_id INTEGER NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (org_id) REFERENCES {organizations_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 9. Course Cohorts table
-        print("  🔗 Creating course_cohorts table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {course_cohorts_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_id INTEGER NOT NULL,
-                cohort_id INTEGER NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (course_id) REFERENCES {courses_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (cohort_id) REFERENCES {cohorts_table_name}(id) ON DELETE CASCADE,
-                UNIQUE(course_id, cohort_id)
-            )
-        """)
-        
-        # 10. Tasks table
-        print("  📝 Creating tasks table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {tasks_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                type TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'draft',
-                org_id INTEGER NOT NULL,
-                milestone_id INTEGER,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                deleted_at DATETIME,
-                FOREIGN KEY (org_id) REFERENCES {organizations_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (milestone_id) REFERENCES {milestones_table_name}(id) ON DELETE SET NULL
-            )
-        """)
-        
-        # 11. Questions table
-        print("  ❓ Creating questions table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {questions_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                task_id INTEGER NOT NULL,
-                question_text TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (task_id) REFERENCES {tasks_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 12. Course Tasks table
-        print("  🔗 Creating course_tasks table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {course_tasks_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_id INTEGER NOT NULL,
-                task_id INTEGER NOT NULL,
-                task_order INTEGER NOT NULL DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (course_id) REFERENCES {courses_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (task_id) REFERENCES {tasks_table_name}(id) ON DELETE CASCADE,
-                UNIQUE(course_id, task_id)
-            )
-        """)
-        
-        # 13. Course Milestones table
-        print("  🔗 Creating course_milestones table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {course_milestones_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_id INTEGER NOT NULL,
-                milestone_id INTEGER NOT NULL,
-                milestone_order INTEGER NOT NULL DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (course_id) REFERENCES {courses_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (milestone_id) REFERENCES {milestones_table_name}(id) ON DELETE CASCADE,
-                UNIQUE(course_id, milestone_id)
-            )
-        """)
-        
-        # 14. Scorecards table
-        print("  📊 Creating scorecards table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {scorecards_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                org_id INTEGER NOT NULL,
-                criteria TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (org_id) REFERENCES {organizations_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 15. Question Scorecards table
-        print("  🔗 Creating question_scorecards table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {question_scorecards_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                question_id INTEGER NOT NULL,
-                scorecard_id INTEGER NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (question_id) REFERENCES {questions_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (scorecard_id) REFERENCES {scorecards_table_name}(id) ON DELETE CASCADE,
-                UNIQUE(question_id, scorecard_id)
-            )
-        """)
-        
-        # 16. Chat History table
-        print("  💬 Creating chat_history table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {chat_history_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                question_id INTEGER NOT NULL,
-                role TEXT NOT NULL,
-                content TEXT NOT NULL,
-                response_type TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                is_solved BOOLEAN DEFAULT FALSE,
-                FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (question_id) REFERENCES {questions_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 17. Task Completions table
-        print("  ✅ Creating task_completions table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {task_completions_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                task_id INTEGER,
-                question_id INTEGER,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (task_id) REFERENCES {tasks_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (question_id) REFERENCES {questions_table_name}(id) ON DELETE CASCADE,
-                UNIQUE(user_id, task_id),
-                UNIQUE(user_id, question_id)
-            )
-        """)
-        
-        # 18. Course Generation Jobs table (MISSING!)
-        print("  🤖 Creating course_generation_jobs table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {course_generation_jobs_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                org_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                course_name TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'pending',
-                progress INTEGER DEFAULT 0,
-                error_message TEXT,
-                result_data TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (org_id) REFERENCES {organizations_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 19. Task Generation Jobs table (MISSING!)
-        print("  🤖 Creating task_generation_jobs table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {task_generation_jobs_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                org_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                course_id INTEGER NOT NULL,
-                task_name TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'pending',
-                progress INTEGER DEFAULT 0,
-                error_message TEXT,
-                result_data TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (org_id) REFERENCES {organizations_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (course_id) REFERENCES {courses_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 20. Code Drafts table
-        print("  💻 Creating code_drafts table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {code_drafts_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                question_id INTEGER NOT NULL,
-                code TEXT NOT NULL,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, question_id),
-                FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (question_id) REFERENCES {questions_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # === NEW GAMIFICATION TABLES ===
-        
-        # 21. Learning Sessions table (NEW)
-        print("  ⏱️ Creating learning_sessions table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {learning_sessions_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                task_id INTEGER,
-                question_id INTEGER,
-                session_start DATETIME NOT NULL,
-                session_end DATETIME,
-                total_minutes INTEGER DEFAULT 0,
-                active_minutes INTEGER DEFAULT 0,
-                interactions_count INTEGER DEFAULT 0,
-                learning_velocity REAL DEFAULT 0.0,
-                session_quality TEXT CHECK(session_quality IN ('high', 'medium', 'low')) DEFAULT 'medium',
-                is_completed BOOLEAN DEFAULT FALSE,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (task_id) REFERENCES {tasks_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (question_id) REFERENCES {questions_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 22. Weekly Quests table (NEW)
-        print("  🎯 Creating weekly_quests table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {weekly_quests_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                quest_name TEXT NOT NULL,
-                description TEXT NOT NULL,
-                week_start DATE NOT NULL,
-                week_end DATE NOT NULL,
-                org_id INTEGER,
-                cohort_id INTEGER,
-                requirements TEXT NOT NULL,
-                rewards TEXT NOT NULL,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (org_id) REFERENCES {organizations_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (cohort_id) REFERENCES {cohorts_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 23. Quest Completions table (NEW)
-        print("  ✅ Creating quest_completions table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {quest_completions_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                quest_id INTEGER NOT NULL,
-                progress TEXT NOT NULL,
-                is_completed BOOLEAN DEFAULT FALSE,
-                completed_at DATETIME,
-                points_earned INTEGER DEFAULT 0,
-                badges_earned TEXT,
-                proof_data TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, quest_id),
-                FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (quest_id) REFERENCES {weekly_quests_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 24. Grace Tokens table (NEW)
-        print("  🎫 Creating grace_tokens table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {grace_tokens_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                token_type TEXT NOT NULL CHECK(token_type IN ('session_extension', 'quest_retry', 'streak_save', 'quality_adjustment')),
-                granted_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                used_date DATETIME,
-                reason TEXT NOT NULL,
-                quest_id INTEGER,
-                session_id INTEGER,
-                is_used BOOLEAN DEFAULT FALSE,
-                expires_at DATETIME,
-                FOREIGN KEY (user_id) REFERENCES {users_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (quest_id) REFERENCES {weekly_quests_table_name}(id) ON DELETE CASCADE,
-                FOREIGN KEY (session_id) REFERENCES {learning_sessions_table_name}(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # 25. Leaderboard Cache table (NEW)
-        print("  🏆 Creating leaderboard_cache table...")
-        await cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {leaderboard_cache_table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                leaderboard_type TEXT NOT NULL CHECK(leaderboard_type IN ('course', 'cohort', 'topic', 'campus', 'global')),
-                scope_id INTEGER,
-                time_period TEXT NOT NULL CHECK(time_period IN ('weekly', 'monthly', 'all_time')),
-                leaderboard_data TEXT NOT NULL,
-                last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
-                expires_at DATETIME NOT NULL,
-                UNIQUE(leaderboard_type, scope_id, time_period)
-            )
-        """)
-        
-        # Create all indexes
-        print("  📊 Creating indexes for performance...")
-        
-        # Learning sessions indexes
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_learning_sessions_user_id ON {learning_sessions_table_name} (user_id)")
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_learning_sessions_task_id ON {learning_sessions_table_name} (task_id)")
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_learning_sessions_date ON {learning_sessions_table_name} (session_start)")
-        
-        # Weekly quests indexes
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_weekly_quests_week ON {weekly_quests_table_name} (week_start, week_end)")
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_weekly_quests_org ON {weekly_quests_table_name} (org_id)")
-        
-        # Quest completions indexes
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_quest_completions_user_id ON {quest_completions_table_name} (user_id)")
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_quest_completions_quest_id ON {quest_completions_table_name} (quest_id)")
-        
-        # Grace tokens indexes
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_grace_tokens_user_id ON {grace_tokens_table_name} (user_id)")
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_grace_tokens_type ON {grace_tokens_table_name} (token_type)")
-        
-        # Leaderboard cache indexes
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_leaderboard_cache_type_scope ON {leaderboard_cache_table_name} (leaderboard_type, scope_id)")
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_leaderboard_cache_updated ON {leaderboard_cache_table_name} (last_updated)")
-        
-        # Other important indexes
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_chat_history_user_id ON {chat_history_table_name} (user_id)")
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_chat_history_question_id ON {chat_history_table_name} (question_id)")
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_task_completions_user_id ON {task_completions_table_name} (user_id)")
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_task_completions_task_id ON {task_completions_table_name} (task_id)")
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_code_drafts_user_id ON {code_drafts_table_name} (user_id)")
-        await cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_code_drafts_question_id ON {code_drafts_table_name} (question_id)")
-        
-        await conn.commit()
-        print("✅ All 25 tables created successfully!")
+    print(f"📋 Creating {len(all_tables)} tables (including gamification)...")
+    if verbose:
+        for table_name in all_tables:
+            print(f"  • {table_name}")
+    
+    await conn.execute("BEGIN IMMEDIATE")
+    
+    # Tables an earlier schema created are brought up to date before the
+    # rollup tables are seeded from them
+    await migrate_gamification_tables(cursor, existing_tables)
+    
+    # The backend's create functions don't guard their indexes with
+    # IF NOT EXISTS, so only the missing tables are created
+    for table_name, create_table in core_tables:
+        if table_name not in existing_tables:
+            await create_table(cursor)
+    
+    ddl_statements = [
+        *(
+            statement
+            for statement in gamification_table_statements
+            if statement not in gamification_index_statements
+        ),
+        # Earlier versions of this script created this index, which the
+        # UNIQUE(user_id, task_id) constraint already covers
+        "DROP INDEX IF EXISTS idx_task_completions_user_id",
+    ]
+    
+    # executescript commits the tables created above before running the
+    # gamification statements in their own transaction
+    await run_ddl(conn, ddl_statements)
+    print(f"✅ All {len(all_tables)} tables created successfully!")
+
+
+async def create_all_indexes(conn: aiosqlite.Connection):
+    """Create the gamification indexes, once any seed data is in place"""
+    
+    print("\n📊 Creating indexes for performance...")
+    await run_ddl(conn, gamification_index_statements)
+    print("✅ Indexes created successfully!")
 
 
-async def verify_all_tables():
+async def verify_all_tables(conn: aiosqlite.Connection):
     """Verify that all tables were created correctly"""
     
     print("\n🔍 Verifying all table creation...")
     
-    all_tables = [
-        # Existing tables
-        organizations_table_name,
-        org_api_keys_table_name,
-        users_table_name,
-        user_organizations_table_name,
-        milestones_table_name,
-        cohorts_table_name,
-        user_cohorts_table_name,
-        courses_table_name,
-        course_cohorts_table_name,
-        tasks_table_name,
-        questions_table_name,
-        course_tasks_table_name,
-        course_milestones_table_name,
-        scorecards_table_name,
-        question_scorecards_table_name,
-        chat_history_table_name,
-        task_completions_table_name,
-        course_generation_jobs_table_name,  # This was missing!
-        task_generation_jobs_table_name,    # This was missing!
-        code_drafts_table_name,
-        # New gamification tables
-        learning_sessions_table_name,
-        weekly_quests_table_name,
-        quest_completions_table_name,
-        grace_tokens_table_name,
-        leaderboard_cache_table_name
-    ]
+    cursor = await conn.cursor()
     
-    async with aiosqlite.connect(sqlite_db_path) as conn:
-        cursor = await conn.cursor()
-        
-        missing_tables = []
-        existing_tables = []
-        
-        for table_name in all_tables:
-            # Check if table exists
-            await cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-            result = await cursor.fetchone()
-            
-            if result:
-                existing_tables.append(table_name)
+    missing_tables = []
+    existing_tables = []
+    
+    # Read every table name in one query and check against that set,
+    # rather than querying once per table
+    await cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    created_tables = {row[0] for row in await cursor.fetchall()}
+    
+    for table_name in all_tables:
+        if table_name in created_tables:
+            existing_tables.append(table_name)
+            if verbose:
                 print(f"  ✅ {table_name}")
-            else:
-                missing_tables.append(table_name)
-                print(f"  ❌ {table_name} - MISSING")
-        
-        print(f"\n📊 Summary:")
-        print(f"  ✅ Existing tables: {len(existing_tables)}")
-        print(f"  ❌ Missing tables: {len(missing_tables)}")
-        
-        if missing_tables:
-            print(f"  Missing: {', '.join(missing_tables)}")
-        
-        return len(missing_tables) == 0
+        else:
+            missing_tables.append(table_name)
+            print(f"  ❌ {table_name} - MISSING")
+    
+    print(f"\n📊 Summary:")
+    print(f"  ✅ Existing tables: {len(existing_tables)}")
+    print(f"  ❌ Missing tables: {len(missing_tables)}")
+    
+    if missing_tables:
+        print(f"  Missing: {', '.join(missing_tables)}")
+    
+    return len(missing_tables) == 0
 
 
-async def create_sample_quest():
-    """Create a sample weekly quest for testing"""
-    
-    print("\n🎯 Creating sample weekly quest...")
+# Skips a quest that already exists for the same week and scope, so a
+# re-run needs no separate existence check; a row comes back only when one
+# was inserted
+insert_quest_sql = f"""
+    INSERT INTO {weekly_quests_table_name}
+    (quest_name, description, week_start, week_end, org_id, cohort_id, requirements, rewards)
+    SELECT :quest_name, :description, :week_start, :week_end, :org_id, :cohort_id, :requirements, :rewards
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {weekly_quests_table_name}
+        WHERE week_start = :week_start AND week_end = :week_end AND quest_name = :quest_name
+            AND org_id IS :org_id AND cohort_id IS :cohort_id
+    )
+    RETURNING id
+"""
+
+
+async def prepare_sample_quest():
+    """Build the sample weekly quest's data; no database access"""
     
     # Calculate this week's date range
     today = date.today()
     week_start = today - timedelta(days=today.weekday())  # Monday
     week_end = week_start + timedelta(days=6)  # Sunday
     
-    quest_data = {
+    return {
         'quest_name': 'Active Learner Challenge',
         'description': 'Complete 120 active learning minutes, 3 DP passes, and 1 peer review',
         'week_start': week_start.isoformat(),
@@ -570,40 +265,22 @@ async def create_sample_quest():
         'requirements': '{"active_minutes": 120, "dp_passes": 3, "peer_reviews": 1, "session_quality": 0.8}',
         'rewards': '{"points": 500, "badges": ["Active Learner"], "grace_tokens": 2, "leaderboard_boost": 0.1}'
     }
+
+
+async def create_sample_quest(conn: aiosqlite.Connection, quest_data):
+    """Create a sample weekly quest for testing"""
     
-    async with aiosqlite.connect(sqlite_db_path) as conn:
-        cursor = await conn.cursor()
-        
-        # Check if quest already exists for this week
-        await cursor.execute(f"""
-            SELECT id FROM {weekly_quests_table_name} 
-            WHERE week_start = ? AND week_end = ? AND quest_name = ?
-        """, (quest_data['week_start'], quest_data['week_end'], quest_data['quest_name']))
-        
-        existing = await cursor.fetchone()
-        
-        if existing:
-            print(f"  ℹ️ Quest already exists for this week (ID: {existing[0]})")
-        else:
-            await cursor.execute(f"""
-                INSERT INTO {weekly_quests_table_name} 
-                (quest_name, description, week_start, week_end, org_id, cohort_id, requirements, rewards)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                quest_data['quest_name'],
-                quest_data['description'], 
-                quest_data['week_start'],
-                quest_data['week_end'],
-                quest_data['org_id'],
-                quest_data['cohort_id'],
-                quest_data['requirements'],
-                quest_data['rewards']
-            ))
-            
-            await conn.commit()
-            quest_id = cursor.lastrowid
-            print(f"  ✅ Sample quest created with ID: {quest_id}")
-            print(f"     📅 Week: {quest_data['week_start']} to {quest_data['week_end']}")
+    print("\n🎯 Creating sample weekly quest...")
+    
+    async with conn.execute(insert_quest_sql, quest_data) as cursor:
+        inserted = await cursor.fetchone()
+    await conn.commit()
+    
+    if inserted:
+        print(f"  ✅ Sample quest created with ID: {inserted[0]}")
+        print(f"     📅 Week: {quest_data['week_start']} to {quest_data['week_end']}")
+    else:
+        print("  ℹ️ Quest already exists for this week")
 
 
 async def main():
@@ -613,28 +290,40 @@ async def main():
     print("=" * 60)
     
     try:
-        # Check if database file exists
-        if not os.path.exists(sqlite_db_path):
-            print(f"❌ Database file not found: {sqlite_db_path}")
-            print("   Make sure the backend Docker container is running!")
-            return
-        
-        # Force create all tables
-        await create_all_tables_force()
-        
-        # Verify all tables
-        all_created = await verify_all_tables()
-        
-        if all_created:
-            # Create sample quest
-            await create_sample_quest()
+        print(f"🗄️ Connecting to database: {sqlite_db_path}")
+        
+        # One connection serves every step, so the schema is loaded and the
+        # pragmas are applied only once
+        async with connect() as conn:
+            # Force create all tables. The sample quest is prepared alongside:
+            # its Python-side work runs while the DDL is on aiosqlite's
+            # worker thread. Nothing else touches the connection until the
+            # tables exist
+            _, quest_data = await asyncio.gather(
+                create_all_tables(conn),
+                prepare_sample_quest(),
+            )
             
-            print("\n🎉 Complete database setup successful!")
-            print("✅ All 25 tables created (20 existing + 5 gamification)")
-            print("🚀 Backend should now start without errors!")
-            print("🎯 Gamification system ready for testing!")
-        else:
-            print("\n❌ Some tables are still missing - check errors above")
+            # Verify all tables
+            all_created = await verify_all_tables(conn)
+            
+            if all_created:
+                # Create sample quest
+                await create_sample_quest(conn, quest_data)
+                
+                # The indexes are built after seeding, so inserted rows
+                # don't each have to update every index
+                await create_all_indexes(conn)
+                
+                print("\n🎉 Complete database setup successful!")
+                print(
+                    f"✅ All {len(all_tables)} tables created "
+                    f"({len(all_tables) - len(gamification_tables)} existing + {len(gamification_tables)} gamification)"
+                )
+                print("🚀 Backend should now start without errors!")
+                print("🎯 Gamification system ready for testing!")
+            else:
+                print("\n❌ Some tables are still missing - check errors above")
         
     except Exception as e:
         print(f"❌ Error during database setup: {e}")